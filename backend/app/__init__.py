@@ -1,17 +1,36 @@
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
 import os
-from flask import Flask, send_from_directory, render_template
+import queue
+from flask import Flask, abort
+from flask.logging import default_handler
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
-from sqlalchemy import text
 from flask_migrate import Migrate
 from dotenv import load_dotenv
 from datetime import timedelta
 
+from .utils.cache import VersionedCache, json_fingerprint
+from .utils.db_pool import engine_options, init_db_pool
+from .utils.json_provider import FastJSONProvider
+from .utils.passwords import PasswordHasher
+from .utils.replicas import ReplicaRouter, RoutingSession
+from .utils.static_manifest import StaticManifest
+from .utils.storage import AvatarStorage
+from .utils.structured_logging import JSONFormatter, NonBlockingQueueHandler, SamplingFilter, parse_sampling_rates
+from .middleware.compression import init_compression
+from .middleware.metrics import init_metrics
+
 load_dotenv()
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+read_replicas = ReplicaRouter()
+catalog_cache = VersionedCache(fingerprint=json_fingerprint)
+password_hasher = PasswordHasher()
+user_profile_cache = VersionedCache()
+search_cache = VersionedCache()
+avatar_storage = AvatarStorage()
+static_manifest = StaticManifest()
 
 class Config:
     """App configuration variables."""
@@ -23,10 +42,96 @@ class Config:
         SQLALCHEMY_DATABASE_URI = POSTGRES_URI
     print(SQLALCHEMY_DATABASE_URI)
 
+    # Optional comma-separated read replica URIs; sqlite:/// files work for local testing.
+    SQLALCHEMY_REPLICA_URIS = [uri.strip() for uri in os.getenv("POSTGRES_REPLICA_URIS", "").split(",") if uri.strip()]
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    # Whole seconds: Flask-SQLAlchemy passes engine options through engine_from_config,
+    # which coerces pool_timeout to int.
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 10))
+    # RDS and proxies drop idle connections; recycle them before that happens.
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_WAIT_WARNING_MS = float(os.getenv("DB_POOL_WAIT_WARNING_MS", 100))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+    # Applied to every new SQLite connection; see app.utils.db_pool.configure_engine.
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    # Both are per connection, and SQLAlchemy's default pool keeps up to 15 of them
+    # per worker, so keep them small.
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 8 * 1024 * 1024))
+    # Negative values are KiB: 4 MiB of page cache per connection.
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -4 * 1024))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_LOCKED_RETRIES = int(os.getenv("SQLITE_LOCKED_RETRIES", 3))
+    SQLITE_LOCKED_RETRY_DELAY = float(os.getenv("SQLITE_LOCKED_RETRY_DELAY", 0.05))
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=4)
 
+    CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", 300))
+    CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", 1024))
+    CATALOG_HTTP_MAX_AGE = int(os.getenv("CATALOG_HTTP_MAX_AGE", 60))
+    # First pages of search results, kept apart from the catalog so that arbitrary
+    # queries cannot evict the listings and products.
+    SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 300))
+    SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 128))
+
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 5))
+
+    USER_PROFILE_CACHE_TTL = float(os.getenv("USER_PROFILE_CACHE_TTL", 30))
+    USER_PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("USER_PROFILE_CACHE_MAX_ENTRIES", 4096))
+
+    AVATAR_MAX_UPLOAD_BYTES = int(os.getenv("AVATAR_MAX_UPLOAD_BYTES", 5 * 1024 * 1024))
+    AVATAR_MAX_PIXELS = int(os.getenv("AVATAR_MAX_PIXELS", 4096 * 4096))
+    AVATAR_SIZES = [int(size) for size in os.getenv("AVATAR_SIZES", "32,64,256").split(",")]
+    AVATAR_DEFAULT_SIZE = int(os.getenv("AVATAR_DEFAULT_SIZE", 256))
+    AVATAR_FORMAT = os.getenv("AVATAR_FORMAT", "WEBP")
+    AVATAR_QUALITY = int(os.getenv("AVATAR_QUALITY", 80))
+    AVATAR_CACHE_MAX_AGE = int(os.getenv("AVATAR_CACHE_MAX_AGE", 365 * 24 * 3600))
+    AVATAR_STORAGE = os.getenv("AVATAR_STORAGE", "local")
+    AVATAR_LOCAL_FOLDER = os.getenv("AVATAR_LOCAL_FOLDER", os.path.join(os.getcwd(), "avatar"))
+    AVATAR_S3_BUCKET = os.getenv("AVATAR_S3_BUCKET")
+    AVATAR_S3_PREFIX = os.getenv("AVATAR_S3_PREFIX", "avatars/")
+    AVATAR_S3_ENDPOINT_URL = os.getenv("AVATAR_S3_ENDPOINT_URL")
+    AVATAR_S3_REGION = os.getenv("AVATAR_S3_REGION")
+    AVATAR_S3_PRESIGN_EXPIRES = int(os.getenv("AVATAR_S3_PRESIGN_EXPIRES", 3600))
+
+    STATIC_IMMUTABLE_MAX_AGE = int(os.getenv("STATIC_IMMUTABLE_MAX_AGE", 365 * 24 * 3600))
+    STATIC_MEMORY_MAX_BYTES = int(os.getenv("STATIC_MEMORY_MAX_BYTES", 256 * 1024))
+
+    HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", 5))
+    HEALTH_MIN_FREE_DISK_MB = int(os.getenv("HEALTH_MIN_FREE_DISK_MB", 100))
+    HEALTH_POOL_SATURATION_WARNING = float(os.getenv("HEALTH_POOL_SATURATION_WARNING", 0.9))
+
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # The app only serves METRICS_PATH when enabled; otherwise scrape the separate
+    # METRICS_PORT that gunicorn.conf.py opens, which the load balancer does not expose.
+    METRICS_ENDPOINT_ENABLED = os.getenv("METRICS_ENDPOINT_ENABLED", "false").lower() == "true"
+    METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+
+    LOG_FILE = os.getenv("LOG_FILE", "logs/app.log")
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 50 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+    LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN")
+    LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() == "true"
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    # e.g. "app.controllers.product_controller=0.1"; empty keeps every record.
+    LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", 2))
+    PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", 16))
+    PASSWORD_POOL_TIMEOUT = float(os.getenv("PASSWORD_POOL_TIMEOUT", 5))
+    PASSWORD_POOL_START_METHOD = os.getenv("PASSWORD_POOL_START_METHOD", "forkserver")
+
 
 def create_app():
     """
@@ -43,17 +148,39 @@ def create_app():
                 template_folder=os.path.join(os.path.dirname(__file__), "../../frontend/build"))
     CORS(app, resources={r"/*": {"origins": "*"}})
     app.config.from_object(Config)
+    app.json = FastJSONProvider(app)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"], app.config)
 
     db.init_app(app)
+    read_replicas.init_app(app)
+    catalog_cache.init_app(app, "CATALOG_CACHE")
+    catalog_cache.store_guard = read_replicas.may_store if read_replicas.engines else None
+    search_cache.init_app(app, "SEARCH_CACHE")
+    search_cache.store_guard = catalog_cache.store_guard
+    user_profile_cache.init_app(app, "USER_PROFILE_CACHE")
+    password_hasher.init_app(app)
+    avatar_storage.init_app(app)
 
-    with app.app_context():
-        if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
-            db.session.execute(text('PRAGMA foreign_keys=ON'))
-
-    JWTManager(app)
+    jwt = JWTManager(app)
     Migrate(app, db)
     setup_logging(app)
 
+    from .commands import register_commands
+    from .services.user_service import load_user_profile
+
+    @jwt.user_lookup_loader
+    def load_current_user(_jwt_header, jwt_data):
+        # Flask-JWT-Extended calls this once per request and keeps the result as
+        # `current_user`, so controllers never need to load the user row again.
+        return load_user_profile(jwt_data["sub"])
+
+    with app.app_context():
+        init_db_pool(app, [db.engine, *read_replicas.engines])
+
+    register_commands(app)
+    init_metrics(app)
+    init_compression(app)
+
     from .routes.auth_routes import auth_bp
     from .routes.user_routes import user_bp
     from .routes.product_routes import product_bp
@@ -64,34 +191,75 @@ def create_app():
     app.register_blueprint(product_bp)
     app.register_blueprint(health_bp)
 
+    static_manifest.init_app(app, app.template_folder)
+
+    def serve_static(filename):
+        path = f"static/{filename}"
+        if static_manifest.get(path) is None:
+            abort(404)
+        return static_manifest.serve(path, app.response_class)
+
+    # Flask's own static view stats the file on every request; serve the build's
+    # static folder from the manifest instead.
+    app.view_functions["static"] = serve_static
+
     @app.route("/", defaults={"path": ""})
     @app.route("/<path:path>")
     def serve_react_app(path):
-        if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
-            return send_from_directory(app.static_folder, path)
-        else:
-            return render_template("index.html")
+        for candidate in (path, f"static/{path}"):
+            if path != "" and static_manifest.get(candidate) is not None:
+                return static_manifest.serve(candidate, app.response_class)
+        if static_manifest.get("index.html") is None:
+            abort(404)
+        return static_manifest.serve("index.html", app.response_class)
 
     return app
 
 
 def setup_logging(app):
     """
-    Set up logging to a file, creating the log file if it doesn't exist.
-    Logs will rotate when they reach a certain size.
-    """
-    if not os.path.exists('logs'):
-        os.mkdir('logs')
+    Set up logging to a file, creating the log directory if it doesn't exist.
 
-    log_file = 'logs/app.log'
+    Records are put on an in-memory queue by the request threads and written by a
+    background listener thread, so log I/O never runs on the request path. Logs
+    rotate when they reach LOG_MAX_BYTES, or on the LOG_ROTATE_WHEN schedule if it is
+    set. LOG_FORMAT selects JSON lines or plain text, and LOG_SAMPLING keeps only a
+    fraction of the INFO records of the given loggers.
+    """
+    config = app.config
+    log_dir = os.path.dirname(config['LOG_FILE'])
+    if log_dir and not os.path.exists(log_dir):
+        os.makedirs(log_dir, exist_ok=True)
 
-    file_handler = RotatingFileHandler(log_file, maxBytes=1024 * 1024, backupCount=5)
-    file_handler.setLevel(logging.INFO)
+    if config['LOG_ROTATE_WHEN']:
+        file_handler = TimedRotatingFileHandler(config['LOG_FILE'], when=config['LOG_ROTATE_WHEN'],
+                                                backupCount=config['LOG_BACKUP_COUNT'], delay=True)
+    else:
+        file_handler = RotatingFileHandler(config['LOG_FILE'], maxBytes=config['LOG_MAX_BYTES'],
+                                           backupCount=config['LOG_BACKUP_COUNT'], delay=True)
 
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    if config['LOG_FORMAT'] == 'json':
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
     file_handler.setFormatter(formatter)
+    handlers = [file_handler]
+    if config['LOG_CONSOLE']:
+        # Replaces Flask's default stderr handler, which would write on the request thread.
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+    app.logger.removeHandler(default_handler)
+
+    for handler in [h for h in app.logger.handlers if isinstance(h, NonBlockingQueueHandler)]:
+        app.logger.removeHandler(handler)
+        handler.stop_listener()
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=config['LOG_QUEUE_SIZE']))
+    queue_handler.addFilter(SamplingFilter(parse_sampling_rates(config['LOG_SAMPLING'])))
+    queue_handler.start_listener(*handlers)
 
-    app.logger.addHandler(file_handler)
-    app.logger.setLevel(logging.INFO)
+    app.logger.addHandler(queue_handler)
+    app.logger.setLevel(config['LOG_LEVEL'])
@@ -0,0 +1,115 @@
+import mimetypes
+import os
+import time
+import click
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from . import avatar_storage, db
+from .middleware.compression import COMPRESSIBLE_MIMETYPES
+from .services.product_service import recompute_review_aggregates
+from .services.search_service import rebuild_search_index
+from .services.seed_service import DEFAULT_BATCH_SIZE, DumpParseError, generate_synthetic_data, load_sql_dump
+from .services.user_service import migrate_legacy_product_lists, prune_unused_avatars
+from .utils.static_manifest import precompress_file
+
+
+def register_commands(app):
+    """
+    Registers the application's maintenance commands on the Flask CLI.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index_command():
+        """Rebuild the product full-text search index from the products table."""
+        rebuild_search_index()
+        current_app.logger.info("Product search index rebuilt.")
+        click.echo("Product search index rebuilt.")
+
+    @app.cli.command("repair-review-aggregates")
+    def repair_review_aggregates_command():
+        """Recompute every product's review count, rating sum and histogram."""
+        updated = recompute_review_aggregates()
+        click.echo(f"Recomputed review aggregates for {updated} products.")
+
+    @app.cli.command("migrate-user-product-lists")
+    def migrate_user_product_lists_command():
+        """Move legacy fav_products/purchased_products strings into the join tables."""
+        inserted = migrate_legacy_product_lists(db.session.connection())
+        db.session.commit()
+        click.echo(f"Migrated {inserted['favorites']} favorites and {inserted['purchases']} purchases.")
+
+    @app.cli.command("load-sql-dump")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False),
+                    default=os.path.join(os.path.dirname(app.root_path), "data_dump.sql"))
+    @click.option("--replace", is_flag=True, help="Delete all existing rows first.")
+    @click.option("--batch-size", type=click.IntRange(min=1), default=DEFAULT_BATCH_SIZE, show_default=True)
+    def load_sql_dump_command(path, replace, batch_size):
+        """Load the INSERTs of a SQL dump, e.g. data_dump.sql or app/sqlite_dump_clean.sql."""
+        try:
+            loaded = load_sql_dump(path, replace=replace, batch_size=batch_size)
+        except DumpParseError as e:
+            raise click.ClickException(f"Could not parse {path}: {e}")
+        except IntegrityError as e:
+            db.session.rollback()
+            raise click.ClickException(f"Rows of the dump already exist; use --replace. ({e.orig})")
+        click.echo(", ".join(f"{count} {table}" for table, count in loaded.items()) + " loaded.")
+
+    @app.cli.command("generate-synthetic-data")
+    @click.option("--users", type=click.IntRange(min=0), default=0)
+    @click.option("--products", type=click.IntRange(min=0), default=0)
+    @click.option("--reviews", type=click.IntRange(min=0), default=0)
+    @click.option("--baskets", type=click.IntRange(min=0), default=0, help="Users without a basket to give one.")
+    @click.option("--purchases", type=click.IntRange(min=0), default=0, help="Orders to create.")
+    @click.option("--seed", type=int, default=0, show_default=True)
+    @click.option("--password", default="password", show_default=True, help="Password of the generated users.")
+    @click.option("--batch-size", type=click.IntRange(min=1), default=DEFAULT_BATCH_SIZE, show_default=True)
+    def generate_synthetic_data_command(users, products, reviews, baskets, purchases, seed, password, batch_size):
+        """Add deterministic, seeded synthetic data at a chosen scale."""
+        start = time.perf_counter()
+        try:
+            inserted = generate_synthetic_data(users=users, products=products, reviews=reviews, baskets=baskets,
+                                               purchases=purchases, seed=seed, password=password,
+                                               batch_size=batch_size)
+        except ValueError as e:
+            db.session.rollback()
+            raise click.ClickException(str(e))
+        summary = ", ".join(f"{count} {table}" for table, count in inserted.items()) or "Nothing"
+        click.echo(f"{summary} generated in {time.perf_counter() - start:.1f}s.")
+
+    @app.cli.command("upload-avatars")
+    @click.argument("folder", type=click.Path(exists=True, file_okay=False))
+    def upload_avatars_command(folder):
+        """Copy avatar files from a local folder into the configured avatar storage."""
+        stored = set(avatar_storage.list())
+        uploaded = 0
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if name.startswith(".") or not os.path.isfile(path) or name in stored:
+                continue
+            with open(path, "rb") as source:
+                avatar_storage.save(name, source.read())
+            uploaded += 1
+        click.echo(f"Uploaded {uploaded} avatar files.")
+
+    @app.cli.command("prune-avatars")
+    @click.option("--dry-run", is_flag=True, help="Only list the files that would be deleted.")
+    def prune_avatars_command(dry_run):
+        """Delete stored avatar variants that no user references any more."""
+        deleted = prune_unused_avatars(dry_run=dry_run)
+        for name in deleted:
+            click.echo(name)
+        click.echo(f"{'Would delete' if dry_run else 'Deleted'} {len(deleted)} avatar files.")
+
+    @app.cli.command("precompress-static")
+    def precompress_static_command():
+        """Write .gz/.br siblings for the compressible files of the frontend build."""
+        written = 0
+        for directory, _, filenames in os.walk(app.template_folder):
+            for name in filenames:
+                if name.endswith((".gz", ".br")) or mimetypes.guess_type(name)[0] not in COMPRESSIBLE_MIMETYPES:
+                    continue
+                written += len(precompress_file(os.path.join(directory, name)))
+        click.echo(f"Wrote {written} precompressed files; restart the app to pick them up.")
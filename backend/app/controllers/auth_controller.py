@@ -5,6 +5,13 @@ from pydantic import ValidationError
 from ..helpers import format_validation_error
 from ..models.user_model import UserRegistration, UserLogin
 from ..services.auth_service import register_user, login_user
+from ..utils.passwords import PasswordPoolSaturated, PasswordPoolTimeout
+
+
+def _busy_response():
+    response = jsonify({'error': 'Server is busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 
 def register():
@@ -19,18 +26,22 @@ def register():
     """
     try:
         data = UserRegistration(**request.get_json())
-        current_app.logger.info(f"Received registration data for user: {data.username}")
+        current_app.logger.info("Received registration data for user: %s", data.username)
     except ValidationError as e:
         formatted_error = format_validation_error(e)
-        current_app.logger.error(f"Validation error during registration: {formatted_error}")
+        current_app.logger.error("Validation error during registration: %s", formatted_error)
         return jsonify({'error': formatted_error}), 400
 
-    response, status = register_user(data)
+    try:
+        response, status = register_user(data)
+    except (PasswordPoolSaturated, PasswordPoolTimeout) as e:
+        current_app.logger.warning("Registration rejected for user %s: %s", data.username, e)
+        return _busy_response()
 
     if status == 201:
-        current_app.logger.info(f"User {data.username} registered successfully.")
+        current_app.logger.info("User %s registered successfully.", data.username)
     else:
-        current_app.logger.warning(f"Failed to register user {data.username}: {response['error']}")
+        current_app.logger.warning("Failed to register user %s: %s", data.username, response['error'])
 
     return jsonify(response), status
 
@@ -47,17 +58,21 @@ def login():
     """
     try:
         data = UserLogin(**request.get_json())
-        current_app.logger.info(f"Received login attempt for user: {data.email}")
+        current_app.logger.info("Received login attempt for user: %s", data.email)
     except ValidationError as e:
         formatted_error = format_validation_error(e)
-        current_app.logger.error(f"Validation error during login: {formatted_error}")
+        current_app.logger.error("Validation error during login: %s", formatted_error)
         return jsonify({'error': formatted_error}), 400
 
-    user = login_user(data)
+    try:
+        user = login_user(data)
+    except (PasswordPoolSaturated, PasswordPoolTimeout) as e:
+        current_app.logger.warning("Login rejected for user %s: %s", data.email, e)
+        return _busy_response()
     if 'error' in user:
-        current_app.logger.warning(f"Login failed for user {data.email}: {user['error']}")
+        current_app.logger.warning("Login failed for user %s: %s", data.email, user['error'])
         return jsonify(user), 401
 
     access_token = create_access_token(identity=str(user['_id']))
-    current_app.logger.info(f"User {user['username']} logged in successfully.")
+    current_app.logger.info("User %s logged in successfully.", user['username'])
     return jsonify({'access_token': access_token}), 200
@@ -1,14 +1,52 @@
 from flask import jsonify
-from ..services.health_service import perform_health_check
+from ..services.health_service import get_pool_status, get_readiness
 
 
 def health_check():
     """
     Health check endpoint to verify network reachability and database connection.
 
+    Answers from the background prober's latest result instead of querying the
+    database on every request.
+
     Returns:
         JSON response with status of API and database.
     """
-    result = perform_health_check()
+    result = get_readiness()
     status_code = 200 if result["status"] == "OK" else 500
     return jsonify(result), status_code
+
+
+def liveness():
+    """
+    Liveness probe: the process is up and serving requests. Never touches the
+    database, so a database outage does not get healthy workers restarted.
+
+    Returns:
+        JSON response with status OK.
+    """
+    return jsonify({"status": "OK"}), 200
+
+
+def readiness():
+    """
+    Readiness probe: the latest background check of the database, the connection
+    pool and the avatar disk.
+
+    Returns:
+        JSON response with the check results; 503 if any check failed.
+    """
+    result = get_readiness()
+    status_code = 200 if result["status"] == "OK" else 503
+    return jsonify(result), status_code
+
+
+def pool_health():
+    """
+    Connection pool introspection for this worker: checked-out, idle and overflow
+    connections and checkout wait times.
+
+    Returns:
+        JSON response with the pool status.
+    """
+    return jsonify(get_pool_status()), 200
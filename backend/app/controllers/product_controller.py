@@ -1,28 +1,129 @@
+import logging
+import math
 from flask import jsonify, request
+from .. import catalog_cache
 from ..services.product_service import get_all_products, get_product_by_id, add_review_to_product, \
-    remove_review_from_product, update_product_review
-from flask_jwt_extended import jwt_required, get_jwt_identity
+    remove_review_from_product, update_product_review, get_products_page, all_products_cache_key, \
+    products_page_cache_key, product_cache_key, get_product_favorite_count
+from flask_jwt_extended import current_user, jwt_required
 from sqlalchemy.exc import DataError
-from flask import current_app
-from ..services.user_service import get_user_info
+from ..services.search_service import search_products
+from ..utils.http_cache import not_modified_response, with_cache_headers
+from ..utils.pagination import parse_limit
+from ..utils.structured_logging import AUDIT
+
+# A child of the app logger, so LOG_SAMPLING can thin out this module's success messages.
+# State changes are logged with extra=AUDIT and are never sampled.
+logger = logging.getLogger(__name__)
+
+PAGINATION_PARAMS = ("limit", "cursor", "category", "min_price", "max_price", "is_alcohol", "sort", "order")
+
+
+def _parse_bool(value):
+    return value.lower() in ("1", "true", "yes")
+
+
+def _parse_price(value):
+    price = float(value)
+    # float() accepts "nan" and "inf", which would make the filter match nothing or
+    # everything.
+    if not math.isfinite(price):
+        raise ValueError(f"Invalid price: {value}")
+    return price
+
+
+def _parse_product_page_args(args):
+    """
+    Parses the pagination, filter and sort query parameters of the product listing.
+
+    Raises:
+        ValueError: If any parameter has an invalid value.
+    """
+    filters = {
+        "category": args.get("category"),
+        "min_price": _parse_price(args["min_price"]) if "min_price" in args else None,
+        "max_price": _parse_price(args["max_price"]) if "max_price" in args else None,
+        "is_alcohol": _parse_bool(args["is_alcohol"]) if "is_alcohol" in args else None,
+    }
+    order = args.get("order", "asc").lower()
+    if order not in ("asc", "desc"):
+        raise ValueError(f"Invalid sort order: {order}")
+    return {
+        "filters": filters,
+        "sort": args.get("sort", "id"),
+        "descending": order == "desc",
+        "limit": parse_limit(args.get("limit"), default=50, maximum=200),
+        "cursor": args.get("cursor"),
+    }
 
 
 def fetch_all_products():
     """
     Fetches all products from the database and returns them in JSON format.
 
+    Passing `lean=true` as a query parameter replaces each product's reviews with
+    its review count and average rating. Passing any of `limit`, `cursor`, `category`,
+    `min_price`, `max_price`, `is_alcohol`, `sort` (id, price, name, rating) or `order`
+    (asc, desc) switches to a keyset-paginated response with `items` and `next_cursor`.
+
+    Responses carry an ETag; a request whose If-None-Match still matches the cached
+    catalog gets a 304 without touching the database.
+
     Returns:
-        JSON: A JSON response containing a list of all products.
+        JSON: A JSON response containing a list of all products, or one page of them.
     """
+    lean = _parse_bool(request.args.get("lean", "false"))
+    if any(param in request.args for param in PAGINATION_PARAMS):
+        try:
+            page_args = _parse_product_page_args(request.args)
+            cache_key = products_page_cache_key(lean=lean, **page_args)
+            not_modified = not_modified_response(catalog_cache, cache_key)
+            if not_modified:
+                return not_modified
+            page = get_products_page(lean=lean, **page_args)
+        except ValueError as e:
+            logger.warning("Invalid product listing parameters: %s", e)
+            return jsonify({"error": str(e)}), 400
+        logger.info("Fetched a page of products.")
+        return with_cache_headers(jsonify(page), catalog_cache, cache_key), 200
+
+    cache_key = all_products_cache_key(lean)
+    not_modified = not_modified_response(catalog_cache, cache_key)
+    if not_modified:
+        return not_modified
     try:
-        products = get_all_products()
-        current_app.logger.info("Fetched all products.")
-        return jsonify(products), 200
+        products = get_all_products(lean=lean)
+        logger.info("Fetched all products.")
+        return with_cache_headers(jsonify(products), catalog_cache, cache_key), 200
     except Exception as e:
-        current_app.logger.error(f"Error fetching all products: {str(e)}")
+        logger.error("Error fetching all products: %s", e)
         return jsonify({"error": "Unable to fetch products"}), 500
 
 
+def search():
+    """
+    Searches products by name, description and category.
+
+    Query parameters: `q` (required), `limit`, `cursor` and `lean`.
+
+    Returns:
+        JSON: A JSON response containing one ranked page of matching products.
+    """
+    query = request.args.get("q", "")
+    try:
+        page = search_products(
+            query,
+            limit=parse_limit(request.args.get("limit"), default=20, maximum=100),
+            cursor=request.args.get("cursor"),
+            lean=_parse_bool(request.args.get("lean", "false")),
+        )
+    except ValueError as e:
+        logger.warning("Invalid search request '%s': %s", query, e)
+        return jsonify({"error": str(e)}), 400
+    logger.info("Searched products for '%s'.", query)
+    return jsonify(page), 200
+
+
 def get_single_product(product_id):
     """
     Fetches a single product by its ID and returns it in JSON format.
@@ -36,23 +137,47 @@ def get_single_product(product_id):
     """
     try:
         product_id = int(product_id)
-        current_app.logger.info(f"Fetching product with ID {product_id}.")
+        logger.info("Fetching product with ID %s.", product_id)
     except ValueError:
-        current_app.logger.warning(f"Invalid product ID format: {product_id}")
+        logger.warning("Invalid product ID format: %s", product_id)
         return jsonify({"error": "Invalid product ID"}), 400
 
+    not_modified = not_modified_response(catalog_cache, product_cache_key(product_id))
+    if not_modified:
+        return not_modified
+
     try:
         product = get_product_by_id(product_id)
         if product:
-            current_app.logger.info(f"Product with ID {product_id} found.")
-            return jsonify(product), 200
-        current_app.logger.warning(f"Product with ID {product_id} not found.")
+            logger.info("Product with ID %s found.", product_id)
+            return with_cache_headers(jsonify(product), catalog_cache, product_cache_key(product_id)), 200
+        logger.warning("Product with ID %s not found.", product_id)
         return jsonify({'error': 'Product not found'}), 404
     except DataError as e:
-        current_app.logger.error(f"Database error fetching product with ID {product_id}: {str(e)}")
+        logger.error("Database error fetching product with ID %s: %s", product_id, e)
         return jsonify({"error": "Invalid product ID format"}), 400
 
 
+def get_favorite_count(product_id):
+    """
+    Returns how many users have a product in their favorites.
+
+    Args:
+        product_id (str): The ID of the product.
+
+    Returns:
+        JSON: A JSON response with the product ID and its favorites count.
+    """
+    try:
+        product_id = int(product_id)
+    except ValueError:
+        logger.warning("Invalid product ID format: %s", product_id)
+        return jsonify({"error": "Invalid product ID"}), 400
+
+    count = get_product_favorite_count(product_id)
+    return jsonify({"product_id": product_id, "favorites": count}), 200
+
+
 @jwt_required()
 def add_review(product_id):
     """
@@ -65,22 +190,17 @@ def add_review(product_id):
         JSON: A JSON response indicating the result of the review submission.
     """
     try:
-        # Get user ID from JWT
-        user_id = get_jwt_identity()
-        user_info = get_user_info(user_id)
-
-        if not user_info:
-            current_app.logger.warning(f"User {user_id} not found while trying to add a review.")
-            return jsonify({"error": "User not found"}), 404
+        # The JWT user loader has already loaded the user's profile for this request
+        user_id = current_user["id"]
 
         review_data = request.json
-        review_data['author'] = user_info.get('username', 'Anonymous')
+        review_data['author'] = current_user.get('username') or 'Anonymous'
 
         response = add_review_to_product(product_id, review_data)
-        current_app.logger.info(f"User {user_id} added a review for product {product_id}.")
+        logger.info("User %s added a review for product %s.", user_id, product_id, extra=AUDIT)
         return jsonify(response), 200
     except Exception as e:
-        current_app.logger.error(f"Error adding review for product {product_id}: {str(e)}")
+        logger.error("Error adding review for product %s: %s", product_id, e)
         return jsonify({"error": str(e)}), 400
 
 
@@ -90,10 +210,10 @@ def delete_review(product_id):
         data = request.get_json()
         author_name = data.get('author_name')
         response = remove_review_from_product(product_id, author_name)
-        current_app.logger.info(f"Review by {author_name} for product {product_id} deleted.")
+        logger.info("Review by %s for product %s deleted.", author_name, product_id, extra=AUDIT)
         return jsonify(response), 200
     except Exception as e:
-        current_app.logger.error(f"Error deleting review for product {product_id}: {str(e)}")
+        logger.error("Error deleting review for product %s: %s", product_id, e)
         return jsonify({"error": str(e)}), 400
 
 
@@ -101,21 +221,21 @@ def delete_review(product_id):
 def update_review(product_id):
     try:
         data = request.json
-        current_app.logger.info(f"Received data for update: {data}")
+        logger.info("Received data for update: %s", data)
 
         author_name = data.get('author_name')
 
         if not author_name:
-            current_app.logger.warning(f"Attempt to update review without author name for product {product_id}.")
+            logger.warning("Attempt to update review without author name for product %s.", product_id)
             return jsonify({"error": "Author name is required"}), 400
 
         try:
             rating = int(data.get("rating"))
             if rating < 1 or rating > 5:
-                current_app.logger.warning(f"Invalid rating value {rating} for product {product_id}.")
+                logger.warning("Invalid rating value %s for product %s.", rating, product_id)
                 return jsonify({"error": "Rating must be between 1 and 5"}), 400
         except (ValueError, TypeError):
-            current_app.logger.warning(f"Invalid rating format for product {product_id}.")
+            logger.warning("Invalid rating format for product %s.", product_id)
             return jsonify({"error": "Invalid rating value"}), 400
 
         updated_data = {
@@ -124,12 +244,12 @@ def update_review(product_id):
         }
 
         if updated_data["comment"] is None:
-            current_app.logger.warning(f"Missing comment while updating review for product {product_id}.")
+            logger.warning("Missing comment while updating review for product %s.", product_id)
             return jsonify({"error": "Comment is required"}), 400
 
         response = update_product_review(product_id, author_name, updated_data)
-        current_app.logger.info(f"Review by {author_name} for product {product_id} updated.")
+        logger.info("Review by %s for product %s updated.", author_name, product_id, extra=AUDIT)
         return jsonify(response), 200
     except Exception as e:
-        current_app.logger.error(f"Error updating review for product {product_id}: {str(e)}")
+        logger.error("Error updating review for product %s: %s", product_id, e)
         return jsonify({"error": str(e)}), 400
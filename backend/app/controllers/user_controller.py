@@ -1,8 +1,17 @@
-from flask import jsonify, request, current_app, send_from_directory
-from flask_jwt_extended import get_jwt_identity, jwt_required
+import logging
+from flask import jsonify, request, current_app
+from flask_jwt_extended import current_user, get_jwt_identity, jwt_required
+from .. import avatar_storage
+from ..services.order_service import checkout, get_user_orders
 from ..services.user_service import add_to_favorites, get_user_favorites, remove_from_favorites, sync_basket_service, \
-    get_user_basket, remove_from_basket_service, add_product_to_purchased, get_user_purchased_products, get_user_info, \
-    clear_user_basket, save_avatar, UPLOAD_FOLDER, get_all_users
+    get_user_basket, remove_from_basket_service, get_user_purchased_products, get_user_info, save_avatar, \
+    get_all_users, avatar_variant_name, is_content_addressed_avatar
+from ..utils.pagination import parse_limit
+from ..utils.structured_logging import AUDIT
+
+# A child of the app logger, so LOG_SAMPLING can thin out this module's success messages.
+# State changes are logged with extra=AUDIT and are never sampled.
+logger = logging.getLogger(__name__)
 
 
 @jwt_required()
@@ -13,7 +22,7 @@ def get_all_users_info():
     Returns:
         JSON: A JSON response containing the list of all users and their information.
     """
-    current_app.logger.info("Fetching information for all users.")
+    logger.info("Fetching information for all users.")
     users_info = get_all_users()
     return jsonify(users_info), 200
 
@@ -25,15 +34,15 @@ def get_current_user_info():
     Returns:
         JSON: A JSON response containing the user's information.
     """
-    user_id = get_jwt_identity()
-    current_app.logger.info(f"Fetching info for user {user_id}.")
+    user_id = current_user["id"]
+    logger.info("Fetching info for user %s.", user_id)
 
-    user_info = get_user_info(user_id)
+    user_info = get_user_info(user_id, profile=current_user)
     if user_info:
-        current_app.logger.info(f"User info for {user_id} retrieved successfully.")
+        logger.info("User info for %s retrieved successfully.", user_id)
         return jsonify(user_info), 200
 
-    current_app.logger.warning(f"User with ID {user_id} not found.")
+    logger.warning("User with ID %s not found.", user_id)
     return jsonify({"error": "User not found"}), 404
 
 
@@ -47,14 +56,15 @@ def add_favorite():
     """
     user_id = get_jwt_identity()
     product_id = request.json.get("product_id")
-    current_app.logger.info(f"User {user_id} attempting to add product {product_id} to favorites.")
+    logger.info("User %s attempting to add product %s to favorites.", user_id, product_id)
 
     result = add_to_favorites(user_id, product_id)
     if "error" not in result:
-        current_app.logger.info(f"Product {product_id} added to favorites for user {user_id}.")
+        logger.info("Product %s added to favorites for user %s.", product_id, user_id, extra=AUDIT)
         return jsonify({"message": "Product added to favorites"}), 201
 
-    current_app.logger.warning(f"Failed to add product {product_id} to favorites for user {user_id}: {result['error']}")
+    logger.warning(
+        "Failed to add product %s to favorites for user %s: %s", product_id, user_id, result['error'])
     return jsonify(result), 400
 
 
@@ -68,15 +78,16 @@ def remove_favorite():
     """
     user_id = get_jwt_identity()
     product_id = request.json.get("product_id")
-    current_app.logger.info(f"User {user_id} attempting to remove product {product_id} from favorites.")
+    logger.info("User %s attempting to remove product %s from favorites.", user_id, product_id)
 
     result = remove_from_favorites(user_id, product_id)
     if "error" not in result:
-        current_app.logger.info(f"Product {product_id} removed from favorites for user {user_id}.")
+        logger.info("Product %s removed from favorites for user %s.", product_id, user_id, extra=AUDIT)
         return jsonify({"message": "Product removed from favorites"}), 200
 
-    current_app.logger.warning(
-        f"Failed to remove product {product_id} from favorites for user {user_id}: {result['error']}")
+    logger.warning(
+        "Failed to remove product %s from favorites for user %s: %s",
+        product_id, user_id, result['error'])
     return jsonify(result), 400
 
 
@@ -89,10 +100,10 @@ def get_favorites():
         JSON: A JSON response containing the list of favorite products.
     """
     user_id = get_jwt_identity()
-    current_app.logger.info(f"Fetching favorite products for user {user_id}.")
+    logger.info("Fetching favorite products for user %s.", user_id)
 
     favorites = get_user_favorites(user_id)
-    current_app.logger.info(f"Favorite products for user {user_id} retrieved successfully.")
+    logger.info("Favorite products for user %s retrieved successfully.", user_id)
 
     return jsonify(favorites), 200
 
@@ -107,13 +118,13 @@ def sync_basket():
     """
     user_id = get_jwt_identity()
     basket = request.get_json()
-    current_app.logger.info(f"User {user_id} syncing basket.")
+    logger.info("User %s syncing basket.", user_id)
 
     result = sync_basket_service(user_id, basket)
     if "error" in result:
-        current_app.logger.error(f"Error syncing basket for user {user_id}: {result['error']}")
+        logger.error("Error syncing basket for user %s: %s", user_id, result['error'])
     else:
-        current_app.logger.info(f"Basket for user {user_id} synced successfully.")
+        logger.info("Basket for user %s synced successfully.", user_id, extra=AUDIT)
 
     return jsonify(result), 200
 
@@ -127,10 +138,10 @@ def get_basket():
         JSON: A JSON response containing the user's basket.
     """
     user_id = get_jwt_identity()
-    current_app.logger.info(f"Fetching basket for user {user_id}.")
+    logger.info("Fetching basket for user %s.", user_id)
 
     basket = get_user_basket(user_id)
-    current_app.logger.info(f"Basket for user {user_id} retrieved successfully.")
+    logger.info("Basket for user %s retrieved successfully.", user_id)
 
     return jsonify(basket), 200
 
@@ -144,14 +155,15 @@ def remove_from_basket():
     """
     user_id = get_jwt_identity()
     product_id = request.json.get("product_id")
-    current_app.logger.info(f"User {user_id} attempting to remove product {product_id} from basket.")
+    logger.info("User %s attempting to remove product %s from basket.", user_id, product_id)
 
     result = remove_from_basket_service(user_id, product_id)
     if "error" in result:
-        current_app.logger.error(
-            f"Error removing product {product_id} from basket for user {user_id}: {result['error']}")
+        logger.error(
+            "Error removing product %s from basket for user %s: %s",
+            product_id, user_id, result['error'])
     else:
-        current_app.logger.info(f"Product {product_id} removed from basket for user {user_id}.")
+        logger.info("Product %s removed from basket for user %s.", product_id, user_id, extra=AUDIT)
 
     return jsonify(result), 200
 
@@ -159,28 +171,57 @@ def remove_from_basket():
 @jwt_required()
 def purchase_product():
     """
-    Handles the purchase of a product by adding it to the user's purchased products and clearing the basket.
+    Handles the purchase of products as a single checkout transaction that records an order,
+    adds the products to the user's purchased products and clears the basket.
+
+    An empty list, or one in which no ID is a known product, is rejected with 400 and
+    leaves the basket as it is.
 
     Returns:
         JSON: A JSON response indicating success or failure.
     """
     user_id = get_jwt_identity()
     product_ids = request.json.get("purchased_products")
-    current_app.logger.info(f"User {user_id} purchasing products {product_ids}.")
+    logger.info("User %s purchasing products %s.", user_id, product_ids)
 
     if not isinstance(product_ids, list):
-        current_app.logger.warning(f"Invalid data format for purchased products from user {user_id}.")
+        logger.warning("Invalid data format for purchased products from user %s.", user_id)
+        return jsonify({"error": "Invalid data format"}), 400
+
+    # bool is a subclass of int, but true/false are not product IDs.
+    if not all(isinstance(product_id, int) and not isinstance(product_id, bool) for product_id in product_ids):
+        logger.warning("Invalid product IDs in purchase from user %s.", user_id)
         return jsonify({"error": "Invalid data format"}), 400
 
-    # Add products to purchased
-    add_product_to_purchased(user_id, product_ids)
-    current_app.logger.info(f"Products {product_ids} purchased successfully by user {user_id}.")
+    result = checkout(user_id, product_ids)
+    if "error" in result:
+        return jsonify(result), 400
+    logger.info("Products %s purchased successfully by user %s.", product_ids, user_id, extra=AUDIT)
+
+    return jsonify({"message": "Product purchased successfully and basket cleared", **result}), 200
+
+
+@jwt_required()
+def get_orders():
+    """
+    Retrieves the user's order history, newest first, one page at a time.
 
-    # Clear the basket after purchase
-    clear_user_basket(user_id)
-    current_app.logger.info(f"Basket cleared for user {user_id} after purchase.")
+    Query parameters: `limit` and `cursor`.
 
-    return jsonify({"message": "Product purchased successfully and basket cleared"}), 200
+    Returns:
+        JSON: A JSON response containing a page of orders and the next cursor.
+    """
+    user_id = get_jwt_identity()
+    try:
+        orders = get_user_orders(
+            user_id,
+            limit=parse_limit(request.args.get("limit"), default=20, maximum=100),
+            cursor=request.args.get("cursor"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    logger.info("Fetched order history for user %s.", user_id)
+    return jsonify(orders), 200
 
 
 @jwt_required()
@@ -191,10 +232,10 @@ def get_purchased_products():
         JSON: A JSON response containing the list of purchased products.
     """
     user_id = get_jwt_identity()
-    current_app.logger.info(f"Fetching purchased products for user {user_id}.")
+    logger.info("Fetching purchased products for user %s.", user_id)
 
     purchased_products = get_user_purchased_products(user_id)
-    current_app.logger.info(f"Purchased products for user {user_id} retrieved successfully.")
+    logger.info("Purchased products for user %s retrieved successfully.", user_id)
 
     return jsonify(purchased_products), 200
 
@@ -207,7 +248,12 @@ def upload_avatar():
     Returns:
         JSON: A JSON response indicating success or failure.
     """
-    user_id = get_jwt_identity()
+    user_id = current_user["id"]
+
+    # Refuse oversized uploads before the multipart body is parsed at all; the
+    # service still enforces the cap while streaming in case the length is unknown.
+    if (request.content_length or 0) > current_app.config['AVATAR_MAX_UPLOAD_BYTES'] + 64 * 1024:
+        return jsonify({"error": "File is too large"}), 413
 
     if 'file' not in request.files:
         return jsonify({"error": "No file part"}), 400
@@ -227,9 +273,19 @@ def upload_avatar():
 
 def serve_avatar(filename):
     """
-    Serve the avatar image from the avatar folder.
+    Serve the avatar image from the avatar storage backend.
+
+    Processed avatars are requested by their content-addressed name and an optional
+    `size` query parameter, and served as the smallest stored variant at least that
+    large. Since their content never changes under a name, they are cached by
+    clients for a year. Legacy avatars are served as they were uploaded. Depending on
+    the backend, the response is the file itself or a redirect to a presigned URL.
     """
-    try:
-        return send_from_directory(UPLOAD_FOLDER, filename)
-    except FileNotFoundError:
-        return send_from_directory(UPLOAD_FOLDER, 'user_default.png')
+    if is_content_addressed_avatar(filename):
+        sizes = sorted(current_app.config['AVATAR_SIZES'])
+        requested = request.args.get('size', type=int) or current_app.config['AVATAR_DEFAULT_SIZE']
+        size = next((size for size in sizes if size >= requested), sizes[-1])
+        return avatar_storage.serve(avatar_variant_name(filename, size), fallback='user_default.png',
+                                    immutable=True)
+
+    return avatar_storage.serve(filename, fallback='user_default.png')
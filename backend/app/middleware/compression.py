@@ -0,0 +1,100 @@
+import gzip
+from flask import request
+
+from ..utils.cache import VersionedCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "image/svg+xml",
+}
+
+# Encodings in order of preference. A compressed representation gets its own ETag
+# ("<etag>-<coding>") so caches never confuse it with the identity body.
+ENCODINGS = ("br", "gzip")
+
+# Compressed bodies of responses that carry an ETag, keyed by (etag, coding). The
+# catalog responses are cached and fingerprinted, so repeat hits skip compression.
+_compressed_bodies = VersionedCache(max_entries=64, ttl=300)
+
+
+def _choose_encoding():
+    for coding in ENCODINGS:
+        if coding == "br" and brotli is None:
+            continue
+        if request.accept_encodings[coding]:
+            return coding
+    return None
+
+
+def _compress(data: bytes, coding: str, config) -> bytes:
+    if coding == "br":
+        return brotli.compress(data, quality=config["COMPRESS_BROTLI_QUALITY"])
+    return gzip.compress(data, compresslevel=config["COMPRESS_GZIP_LEVEL"], mtime=0)
+
+
+def compress_response(response, config):
+    """
+    Compresses a response body with the best encoding the client accepts.
+
+    Only successful, buffered responses of a compressible type that are at least
+    COMPRESS_MIN_SIZE bytes long are compressed. File responses are streamed and
+    left alone.
+
+    Args:
+        response (Response): The outgoing response.
+        config (Config): The app config.
+
+    Returns:
+        Response: The same response, possibly with a compressed body.
+    """
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or (response.content_length or 0) < config["COMPRESS_MIN_SIZE"]):
+        return response
+
+    coding = _choose_encoding()
+    if coding is None:
+        return response
+
+    etag, is_weak = response.get_etag()
+    cache_key = (etag, coding)
+    body = _compressed_bodies.get(cache_key) if etag else None
+    if body is None:
+        body = _compress(response.get_data(), coding, config)
+        if etag:
+            _compressed_bodies.set(cache_key, body)
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = coding
+    if etag:
+        response.set_etag(f"{etag}-{coding}", weak=is_weak)
+    return response
+
+
+def init_compression(app):
+    """
+    Registers response compression for every blueprint of the app.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    if not app.config["COMPRESS_ENABLED"]:
+        return
+
+    @app.after_request
+    def _compress_response(response):
+        return compress_response(response, app.config)
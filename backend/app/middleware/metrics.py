@@ -0,0 +1,272 @@
+import os
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.util import queue as sqla_queue
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover - metrics are optional
+    Histogram = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+if Histogram is not None:
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds", "Request latency.",
+        ["blueprint", "endpoint", "method", "status"], buckets=LATENCY_BUCKETS)
+    REQUEST_SQL_STATEMENTS = Histogram(
+        "http_request_sql_statements", "SQL statements executed per request.",
+        ["blueprint", "endpoint"], buckets=STATEMENT_BUCKETS)
+    REQUEST_SQL_SECONDS = Histogram(
+        "http_request_sql_duration_seconds", "Total SQL execution time per request.",
+        ["blueprint", "endpoint"], buckets=LATENCY_BUCKETS)
+    RESPONSE_SIZE = Histogram(
+        "http_response_size_bytes", "Response body size, after compression.",
+        ["blueprint", "endpoint"], buckets=SIZE_BUCKETS)
+    POOL_CHECKOUT_WAIT = Histogram(
+        "db_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool.",
+        buckets=POOL_WAIT_BUCKETS)
+
+
+class RequestDBStats:
+    """
+    SQL statement count, SQL time and pool wait of the current request, kept on `g`.
+    """
+    __slots__ = ("statements", "sql_seconds", "pool_wait_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+
+
+def current_db_stats():
+    """
+    Returns the DB stats of the current request, or None outside a request.
+    """
+    if not has_request_context():
+        return None
+    return g.get("_db_stats")
+
+
+class PoolWaitStats:
+    """
+    In-process record of pool checkout waits, shown by /health/pool.
+
+    Keeps totals since startup and the most recent waits for percentiles. Each
+    gunicorn worker has its own pools and therefore its own stats.
+    """
+
+    def __init__(self, recent: int = 1024):
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent = deque(maxlen=recent)
+        self._last_warning = float("-inf")
+        self._suppressed_warnings = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, slow: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.slow_checkouts += slow
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self.recent.append(seconds)
+
+    def take_warning(self, interval: float = 1.0):
+        """
+        Rate-limits slow-checkout warnings to one per interval, so an exhausted pool
+        does not flood the log.
+
+        Returns:
+            int: The number of warnings suppressed since the last one, or None if this
+                one should be suppressed too.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_warning < interval:
+                self._suppressed_warnings += 1
+                return None
+            self._last_warning = now
+            suppressed, self._suppressed_warnings = self._suppressed_warnings, 0
+        return suppressed
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self.recent)
+            checkouts, slow, timeouts = self.checkouts, self.slow_checkouts, self.timeouts
+            total, maximum = self.total_wait, self.max_wait
+
+        def percentile(fraction):
+            return recent[min(len(recent) - 1, int(fraction * len(recent)))] * 1000 if recent else 0.0
+
+        return {
+            "checkouts": checkouts,
+            "slow_checkouts": slow,
+            "timeouts": timeouts,
+            "mean_wait_ms": round(total / checkouts * 1000, 3) if checkouts else 0.0,
+            "max_wait_ms": round(maximum * 1000, 3),
+            "recent_p50_wait_ms": round(percentile(0.5), 3),
+            "recent_p95_wait_ms": round(percentile(0.95), 3),
+        }
+
+
+POOL_WAIT_STATS = PoolWaitStats()
+
+
+class _TimedQueue(sqla_queue.Queue):
+    """
+    The pool's queue of idle connections, timing every take from it.
+    """
+
+    pool = None
+
+    def get(self, block=True, timeout=None):
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            observe_pool_wait(time.perf_counter() - start, self.pool)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that measures how long each checkout waits for an idle connection.
+
+    Only the wait on the pool's queue is timed. Opening a new connection when the
+    pool may still grow, and the pre-ping of a checked-out one, are not waits for
+    the pool and are left out.
+    """
+
+    _queue_class = _TimedQueue
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool.pool = self
+
+    def connect(self):
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            POOL_WAIT_STATS.observe_timeout()
+            if has_app_context():
+                current_app.logger.error("Timed out waiting for a database connection: %s", self.status())
+            raise
+
+
+def observe_pool_wait(seconds: float, pool=None):
+    """
+    Records a checkout wait, and logs a warning if it exceeded DB_POOL_WAIT_WARNING_MS,
+    which means the request queued for a connection.
+    """
+    threshold = current_app.config.get("DB_POOL_WAIT_WARNING_MS", 0) / 1000 if has_app_context() else 0
+    slow = bool(threshold) and seconds >= threshold
+    POOL_WAIT_STATS.observe(seconds, slow)
+    if slow:
+        suppressed = POOL_WAIT_STATS.take_warning()
+        if suppressed is not None:
+            current_app.logger.warning(
+                "Waited %.0f ms for a database connection (%s); %s similar warnings suppressed.",
+                seconds * 1000, pool.status() if pool is not None else "unknown pool", suppressed)
+    if Histogram is not None:
+        POOL_CHECKOUT_WAIT.observe(seconds)
+    stats = current_db_stats()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = current_db_stats()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+
+
+def _labels():
+    return request.blueprint or "app", request.endpoint or "unmatched"
+
+
+def metrics_response(response_class):
+    """
+    Renders every metric in the Prometheus text format.
+
+    Under gunicorn with PROMETHEUS_MULTIPROC_DIR set, each worker writes its samples
+    to that directory and this aggregates all of them, whichever worker serves it.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        body = generate_latest(registry)
+    else:
+        body = generate_latest()
+    return response_class(body, mimetype=CONTENT_TYPE_LATEST.split(";")[0],
+                          headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+def init_metrics(app):
+    """
+    Registers per-request metrics, and the /metrics endpoint if
+    METRICS_ENDPOINT_ENABLED is set. The endpoint is off by default because it would
+    be reachable by anyone who can reach the API; gunicorn.conf.py can serve the same
+    metrics on a separate METRICS_PORT instead.
+
+    Register this before compression so the recorded response size is the size
+    actually sent; after_request hooks run in reverse order of registration.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    if not app.config["METRICS_ENABLED"]:
+        return
+    if Histogram is None:
+        app.logger.warning("prometheus_client is not installed; metrics are disabled.")
+        return
+
+    @app.before_request
+    def _start_request_metrics():
+        g._request_start = time.perf_counter()
+        g._db_stats = RequestDBStats()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        start = g.pop("_request_start", None)
+        stats = g.get("_db_stats")
+        if start is None or request.endpoint == "metrics":
+            return response
+        blueprint, endpoint = _labels()
+        REQUEST_LATENCY.labels(blueprint, endpoint, request.method, str(response.status_code)) \
+            .observe(time.perf_counter() - start)
+        REQUEST_SQL_STATEMENTS.labels(blueprint, endpoint).observe(stats.statements)
+        REQUEST_SQL_SECONDS.labels(blueprint, endpoint).observe(stats.sql_seconds)
+        if response.content_length is not None:
+            RESPONSE_SIZE.labels(blueprint, endpoint).observe(response.content_length)
+        return response
+
+    if app.config["METRICS_ENDPOINT_ENABLED"]:
+        @app.route(app.config["METRICS_PATH"], endpoint="metrics")
+        def metrics():
+            return metrics_response(app.response_class)
@@ -1,8 +1,16 @@
+import math
 from .. import db
 from sqlalchemy.orm import relationship
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_price_id', 'price', 'id'),
+        db.Index('ix_products_name_id', 'name', 'id'),
+        db.Index('ix_products_category_price_id', 'category', 'price', 'id'),
+        db.Index('ix_products_category_name_id', 'category', 'name', 'id'),
+        db.Index('ix_products_average_rating_id', 'average_rating', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -13,8 +21,23 @@ class Product(db.Model):
     is_alcohol = db.Column(db.Boolean, default=False)
     reviews = relationship('Review', backref='product', lazy=True)
 
-    def to_dict(self):
-        return {
+    # Review aggregates, maintained by the review services in the same transaction
+    # as the review write. `flask repair-review-aggregates` recomputes them.
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    average_rating = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    rating_1_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_2_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    @property
+    def rating_histogram(self):
+        return {str(stars): getattr(self, f'rating_{stars}_count') for stars in range(1, 6)}
+
+    def to_dict(self, include_reviews=True):
+        product = {
             'id': self.id,
             'name': self.name,
             'description': self.description,
@@ -22,15 +45,27 @@ class Product(db.Model):
             'category': self.category,
             'image_url': self.image_url,
             'is_alcohol': self.is_alcohol,
-            'reviews': [review.to_dict() for review in self.reviews]
+            'review_count': self.review_count,
+            'average_rating': round(self.average_rating, 2) if self.review_count else None,
+            'rating_histogram': self.rating_histogram,
         }
+        if include_reviews:
+            product['reviews'] = [review.to_dict() for review in self.reviews]
+        return product
+
+
+def rating_bucket(rating):
+    """
+    Returns the histogram bucket (1-5 stars) a rating is counted in.
+    """
+    return min(5, max(1, math.floor(float(rating) + 0.5)))
 
 
 class Review(db.Model):
     __tablename__ = 'reviews'
 
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
     author = db.Column(db.String(100), nullable=False)
     rating = db.Column(db.Float, nullable=False)
     comment = db.Column(db.String(500), nullable=True)
@@ -4,11 +4,15 @@ from pydantic import BaseModel, Field
 
 class BasketItem(db.Model):
     __tablename__ = 'basket_items'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='uq_basket_items_user_product'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    product = db.relationship('Product', lazy=True)
 
     def to_dict(self):
         return {
@@ -18,6 +22,24 @@ class BasketItem(db.Model):
             'user_id': self.user_id
         }
 
+class UserFavorite(db.Model):
+    __tablename__ = 'user_favorites'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True,
+                           index=True)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+
+
+class UserPurchase(db.Model):
+    __tablename__ = 'user_purchases'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True,
+                           index=True)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+
+
 class User(db.Model):
     __tablename__ = 'users'
 
@@ -25,6 +47,10 @@ class User(db.Model):
     username = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
+    # Legacy comma-separated product ID lists, superseded by user_favorites and
+    # user_purchases. They are no longer written. The join tables migration copies
+    # them and leaves them in place for a later cleanup migration to drop;
+    # `flask migrate-user-product-lists` moves any remaining values and empties them.
     fav_products = db.Column(db.String, default="")
     basket_items = db.relationship('BasketItem', backref='user', lazy=True, cascade="all, delete-orphan")
     purchased_products = db.Column(db.String, default="")
@@ -1,6 +1,9 @@
 from flask import Blueprint
-from ..controllers.health_controller import health_check
+from ..controllers.health_controller import health_check, liveness, pool_health, readiness
 
 health_bp = Blueprint('health', __name__)
 
 health_bp.route('/health', methods=['GET'])(health_check)
+health_bp.route('/health/live', methods=['GET'])(liveness)
+health_bp.route('/health/ready', methods=['GET'])(readiness)
+health_bp.route('/health/pool', methods=['GET'])(pool_health)
@@ -1,10 +1,13 @@
 from flask import Blueprint
-from ..controllers.product_controller import fetch_all_products, get_single_product, add_review, delete_review, update_review
+from ..controllers.product_controller import fetch_all_products, get_single_product, add_review, delete_review, \
+    update_review, search, get_favorite_count
 
 product_bp = Blueprint('product', __name__, url_prefix='/api/products')
 
 product_bp.route('/all_products', methods=['GET'])(fetch_all_products)
+product_bp.route('/search', methods=['GET'])(search)
 product_bp.route('/<product_id>', methods=['GET'])(get_single_product)
+product_bp.route('/<product_id>/favorites-count', methods=['GET'])(get_favorite_count)
 
 product_bp.route('/<product_id>/add-review', methods=['POST'])(add_review)
 product_bp.route('/<product_id>/remove-review', methods=['DELETE'])(delete_review)
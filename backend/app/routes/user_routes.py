@@ -1,7 +1,7 @@
 from flask import Blueprint
 from ..controllers.user_controller import add_favorite, get_favorites, remove_favorite, sync_basket, get_basket, \
     remove_from_basket, purchase_product, get_purchased_products, get_current_user_info, upload_avatar, serve_avatar, \
-    get_all_users_info
+    get_all_users_info, get_orders
 
 user_bp = Blueprint('favorite', __name__, url_prefix='/api/me')
 
@@ -20,3 +20,4 @@ user_bp.route('/basket/remove', methods=['POST'])(remove_from_basket)
 
 user_bp.route('/purchase', methods=['POST'])(purchase_product)
 user_bp.route('/purchased-products', methods=['GET'])(get_purchased_products)
+user_bp.route('/orders', methods=['GET'])(get_orders)
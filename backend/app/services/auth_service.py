@@ -1,41 +1,44 @@
 from flask import current_app
-from werkzeug.security import generate_password_hash, check_password_hash
 from ..models.user_model import User
-from .. import db
+from .. import db, password_hasher
 
 
 def register_user(data):
     """
     Register a new user in the database.
 
-    Hashes the user's password and stores the user information in the database.
-    Checks if the username or email already exists.
+    Checks if the username or email already exists, then hashes the user's password
+    in the password hashing pool and stores the user information in the database.
 
     Args:
         data (UserRegistration): User registration data.
 
     Returns:
         tuple: JSON response message and HTTP status code.
+
+    Raises:
+        PasswordPoolSaturated: If the password hashing pool is full.
+        PasswordPoolTimeout: If hashing did not finish within PASSWORD_POOL_TIMEOUT.
     """
     username = data.username
     email = data.email
-    password = generate_password_hash(data.password)
 
-    current_app.logger.info(f"Attempting to register user: {username}")
+    current_app.logger.info("Attempting to register user: %s", username)
 
     if User.query.filter_by(username=username).first():
-        current_app.logger.warning(f"Username {username} already exists.")
+        current_app.logger.warning("Username %s already exists.", username)
         return {'error': 'Username already exists'}, 400
 
     if User.query.filter_by(email=email).first():
-        current_app.logger.warning(f"Email {email} already exists.")
+        current_app.logger.warning("Email %s already exists.", email)
         return {'error': 'Email already exists'}, 400
 
+    password = password_hasher.hash(data.password)
     new_user = User(username=username, email=email, password=password)
     db.session.add(new_user)
     db.session.commit()
 
-    current_app.logger.info(f"User {username} registered successfully.")
+    current_app.logger.info("User %s registered successfully.", username)
     return {'message': 'User registered successfully'}, 201
 
 
@@ -43,30 +46,39 @@ def login_user(data):
     """
     Authenticate a user.
 
-    Verifies the user's email and password against the database records.
+    Verifies the user's email and password against the database records. If the
+    stored hash was made with different hashing parameters than the configured ones,
+    it is transparently replaced with a fresh hash of the same password.
 
     Args:
         data (UserLogin): User login data.
 
     Returns:
         dict: User data if authentication is successful, otherwise an error message.
+
+    Raises:
+        PasswordPoolSaturated: If the password hashing pool is full.
+        PasswordPoolTimeout: If hashing did not finish within PASSWORD_POOL_TIMEOUT.
     """
     email = data.email
     password = data.password
 
-    current_app.logger.info(f"Attempting to login user: {email}")
+    current_app.logger.info("Attempting to login user: %s", email)
 
     user = User.query.filter_by(email=email).first()
 
-    if not user or not check_password_hash(user.password, password):
-        current_app.logger.warning(f"Invalid login attempt for user {email}")
+    if not user or not password_hasher.verify(user.password, password):
+        current_app.logger.warning("Invalid login attempt for user %s", email)
         return {'error': 'Invalid username or password'}
 
-    current_app.logger.info(f"User {user.username} authenticated successfully.")
+    if password_hasher.needs_rehash(user.password):
+        user.password = password_hasher.hash(password)
+        db.session.commit()
+        current_app.logger.info("Rehashed password for user %s with updated parameters.", user.username)
+
+    current_app.logger.info("User %s authenticated successfully.", user.username)
     return {
         '_id': user.id,
         'username': user.username,
-        'email': user.email,
-        'fav_products': user.fav_products,
-        'purchased_products': user.purchased_products
+        'email': user.email
     }
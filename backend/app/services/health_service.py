@@ -1,19 +1,165 @@
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
 from sqlalchemy import text
-from .. import db
+from .. import db, read_replicas
 from flask import current_app
+from ..middleware.metrics import POOL_WAIT_STATS
+from ..utils.db_pool import pool_status
 
-def perform_health_check() -> dict:
+
+def _check_database(engine) -> dict:
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+    except Exception as e:
+        return {"ok": False, "error": str(e).splitlines()[0]}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+def _check_pool(engine, saturation_warning: float) -> dict:
+    status = pool_status(engine)
+    saturation = status.get("saturation", 0.0)
+    return {
+        # A saturated pool means the worker is busy, not broken; taking it out of the
+        # load balancer would only push its traffic onto the others.
+        "ok": True,
+        "saturation": saturation,
+        "saturated": saturation >= saturation_warning,
+        "checked_out": status.get("checked_out"),
+        "overflow": status.get("overflow"),
+    }
+
+
+def _check_disk(folder: str, min_free_bytes: int) -> dict:
+    try:
+        usage = shutil.disk_usage(folder)
+    except OSError as e:
+        return {"ok": False, "path": folder, "error": str(e)}
+    return {
+        "ok": usage.free >= min_free_bytes,
+        "path": folder,
+        "free_mb": usage.free // (1024 * 1024),
+        "used_percent": round(usage.used / usage.total * 100, 1) if usage.total else 0.0,
+    }
+
+
+def probe_readiness() -> dict:
     """
-    Performs a health check by checking if the database is reachable.
+    Runs every readiness check once: database round trip of the primary and each
+    replica, pool saturation, and free disk space for locally stored avatars.
 
     Returns:
-        dict: A dictionary containing the status and message.
+        dict: The overall status, the check time and the result of each check.
     """
-    try:
-        current_app.logger.info("Backend is reachable.")
-        db.session.execute(text('SELECT 1'))
-        current_app.logger.info("Database is reachable.")
-        return {"status": "OK", "message": "Backend and database are reachable."}
-    except Exception as e:
-        current_app.logger.error(f"Health check failed: {e}")
-        return {"status": "ERROR", "message": "Database unreachable."}
+    config = current_app.config
+    checks = {
+        "database": _check_database(db.engine),
+        "pool": _check_pool(db.engine, config["HEALTH_POOL_SATURATION_WARNING"]),
+    }
+    for index, engine in enumerate(read_replicas.engines):
+        checks[f"replica_{index}"] = _check_database(engine)
+    if config["AVATAR_STORAGE"] == "local":
+        checks["avatar_disk"] = _check_disk(config["AVATAR_LOCAL_FOLDER"],
+                                            config["HEALTH_MIN_FREE_DISK_MB"] * 1024 * 1024)
+    ok = all(check["ok"] for check in checks.values())
+    return {
+        "status": "OK" if ok else "ERROR",
+        "message": "Backend and database are reachable." if ok else "Readiness checks failed.",
+        "checked_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "checks": checks,
+    }
+
+
+class HealthProber:
+    """
+    Background thread that refreshes the readiness result every HEALTH_PROBE_INTERVAL
+    seconds, so health endpoints answer from memory however often they are polled.
+
+    The thread is started by the first readiness request of each worker process,
+    which also runs the first probe inline. Status changes are logged; unchanged
+    results are not.
+    """
+
+    def __init__(self):
+        self.result = None
+        self._checked_at = 0.0
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def current(self, app) -> dict:
+        """
+        Returns the latest probe result, or an ERROR result if probing has stalled.
+        """
+        self._ensure_started(app)
+        result = dict(self.result)
+        age = time.monotonic() - self._checked_at
+        result["age_seconds"] = round(age, 1)
+        if age > app.config["HEALTH_PROBE_INTERVAL"] * 3:
+            result["status"] = "ERROR"
+            result["message"] = "Health probe result is stale."
+        return result
+
+    def _ensure_started(self, app):
+        # Threads do not survive gunicorn's fork, so each worker starts its own.
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._refresh(app)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, args=(app,), name="health-prober", daemon=True)
+            self._thread.start()
+
+    def _run(self, app):
+        while True:
+            time.sleep(app.config["HEALTH_PROBE_INTERVAL"])
+            self._refresh(app)
+
+    def _refresh(self, app):
+        with app.app_context():
+            try:
+                result = probe_readiness()
+            except Exception as e:
+                app.logger.exception("Health probe failed: %s", e)
+                result = {"status": "ERROR", "message": "Health probe failed.", "checks": {}}
+            previous = self.result["status"] if self.result else None
+            if result["status"] != previous:
+                if result["status"] == "OK":
+                    app.logger.info("Readiness is OK.")
+                else:
+                    failed = [name for name, check in result["checks"].items() if not check["ok"]]
+                    app.logger.warning("Readiness is %s; failed checks: %s", result["status"], failed)
+            self.result = result
+            self._checked_at = time.monotonic()
+
+
+health_prober = HealthProber()
+
+
+def get_readiness() -> dict:
+    """
+    Returns the cached readiness result of this worker's background prober.
+    """
+    return health_prober.current(current_app._get_current_object())
+
+
+def get_pool_status() -> dict:
+    """
+    Reports the connection pools of this worker process: the primary's, each
+    replica's, and the checkout waits observed so far.
+
+    Returns:
+        dict: The pool states and wait statistics.
+    """
+    return {
+        "primary": pool_status(db.engine),
+        "replicas": [pool_status(engine) for engine in read_replicas.engines],
+        "waits": POOL_WAIT_STATS.snapshot(),
+        "wait_warning_ms": current_app.config["DB_POOL_WAIT_WARNING_MS"],
+    }
@@ -0,0 +1,88 @@
+from flask import current_app
+from sqlalchemy import and_, insert
+from sqlalchemy.orm import selectinload
+from typing import Dict, List, Optional
+from .. import db
+from ..models.order_model import Order, OrderItem
+from ..models.product_model import Product
+from ..models.user_model import BasketItem
+from ..utils.pagination import cursor_field, encode_cursor, decode_cursor
+from .user_service import record_purchases
+
+
+def checkout(user_id: int, product_ids: List[int]) -> Dict:
+    """
+    Purchases products for a user in a single transaction.
+
+    Reads the products together with the user's basket quantities in one query, writes
+    an order with one item per product (price and name snapshotted from the catalog),
+    adds the products to the purchase history and empties the basket with one DELETE.
+    Either all of it is committed or none of it is.
+
+    Products that are not in the basket are bought with a quantity of 1. Unknown
+    product IDs are ignored.
+
+    Args:
+        user_id (int): The ID of the user.
+        product_ids (List[int]): The IDs of the products to purchase.
+
+    Returns:
+        Dict: The created order, or an error.
+    """
+    rows = db.session.query(Product.id, Product.name, Product.price, BasketItem.quantity) \
+        .outerjoin(BasketItem, and_(BasketItem.product_id == Product.id, BasketItem.user_id == user_id)) \
+        .filter(Product.id.in_(set(product_ids))).all()
+    if not rows:
+        current_app.logger.warning("User %s attempted to check out without valid products.", user_id)
+        return {"error": "No valid products to purchase"}
+
+    items = [
+        {"product_id": row.id, "product_name": row.name, "unit_price": row.price, "quantity": row.quantity or 1}
+        for row in rows
+    ]
+    total = round(sum(item["unit_price"] * item["quantity"] for item in items), 2)
+    try:
+        order = Order(user_id=user_id, total=total)
+        db.session.add(order)
+        db.session.flush()
+        order_id = order.id
+
+        db.session.execute(insert(OrderItem), [{"order_id": order_id, **item} for item in items])
+        record_purchases(user_id, [item["product_id"] for item in items])
+        BasketItem.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("Checkout failed for user %s: %s", user_id, e)
+        return {"error": "Failed to complete purchase"}
+
+    current_app.logger.info("User %s placed order %s for products %s.", user_id, order_id, product_ids)
+    return {"order_id": order_id, "total": total}
+
+
+def get_user_orders(user_id: int, limit: int = 20, cursor: Optional[str] = None) -> Dict:
+    """
+    Retrieves one page of the user's orders, newest first.
+
+    Args:
+        user_id (int): The ID of the user.
+        limit (int): Maximum number of orders on the page.
+        cursor (str, optional): The `next_cursor` returned with the previous page.
+
+    Returns:
+        Dict: The orders with their items, the cursor for the next page (or None)
+            and the page size.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    query = Order.query.options(selectinload(Order.items)).filter(Order.user_id == user_id)
+    if cursor:
+        position = decode_cursor(cursor)
+        query = query.filter(Order.id < cursor_field(position, "id", int))
+
+    orders = query.order_by(Order.id.desc()).limit(limit + 1).all()
+    has_more = len(orders) > limit
+    orders = orders[:limit]
+    next_cursor = encode_cursor({"id": orders[-1].id}) if has_more else None
+    return {"items": [order.to_dict() for order in orders], "next_cursor": next_cursor, "limit": limit}
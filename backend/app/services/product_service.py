@@ -1,29 +1,186 @@
-from .. import db
+from .. import db, catalog_cache, search_cache
 from flask import current_app
-from typing import List, Dict
-from ..models.product_model import Review, Product
+from typing import List, Dict, Optional
+from sqlalchemy import case, func, select, tuple_, update
+from sqlalchemy.orm import selectinload
+from ..models.product_model import Review, Product, rating_bucket
+from ..models.user_model import UserFavorite
+from ..utils.pagination import cursor_field, encode_cursor, decode_cursor
+from ..utils.replicas import replica_read
 
+PRODUCT_SORTS = ("id", "price", "name", "rating")
+# Type of the sort value a page cursor carries for each sort other than id.
+SORT_VALUE_TYPES = {"price": (int, float), "name": str, "rating": (int, float)}
 
-def get_all_products() -> List[Dict]:
+
+def all_products_cache_key(lean: bool = False) -> tuple:
+    return ("all_products", lean)
+
+
+def products_page_cache_key(filters: Dict, sort: str, descending: bool, limit: int,
+                            cursor: Optional[str], lean: bool) -> tuple:
+    return ("products_page", tuple(sorted(filters.items())), sort, descending, limit, cursor, lean)
+
+
+def product_cache_key(product_id: int) -> tuple:
+    return ("product", product_id)
+
+
+def invalidate_catalog_caches():
+    """
+    Drops the cached catalog and search results after a change to products or reviews.
+    """
+    catalog_cache.invalidate()
+    search_cache.invalidate()
+
+
+def _load_all_products() -> List[Dict]:
+    version = catalog_cache.version
+    products_collection = Product.query.options(selectinload(Product.reviews)).all()
+    current_app.logger.debug("Products fetched: %s", products_collection)
+    if not products_collection:
+        current_app.logger.error("No products fetched from the database.")
+    products = [product.to_dict() for product in products_collection]
+    for product in products:
+        catalog_cache.set(product_cache_key(product["id"]), product, version=version)
+    return products
+
+
+def serialize_products(products: List[Product], lean: bool = False) -> List[Dict]:
     """
-    Retrieves all products from the database.
+    Serializes a list of products, leaving out the review bodies in lean mode.
+
+    Reviews must already be loaded (e.g. with selectinload) unless lean is True. Both
+    modes include the stored review count, average rating and rating histogram.
+
+    Args:
+        products (List[Product]): The products to serialize.
+        lean (bool): If True, omit the list of reviews.
+
+    Returns:
+        List[Dict]: The serialized products, in the same order.
+    """
+    return [product.to_dict(include_reviews=not lean) for product in products]
+
+
+def _load_product_summaries() -> List[Dict]:
+    return serialize_products(Product.query.all(), lean=True)
+
+
+@replica_read
+def get_all_products(lean: bool = False) -> List[Dict]:
+    """
+    Retrieves all products, serving them from the catalog cache when possible.
+
+    Args:
+        lean (bool): If True, each product carries only its review count and average
+            rating instead of the full list of reviews.
 
     Returns:
         List[Dict]: A list of dictionaries, each representing a product.
     """
     try:
-        products_collection = Product.query.all()
-        current_app.logger.debug(f"Products fetched: {products_collection}")
-        if not products_collection:
-            current_app.logger.error("No products fetched from the database.")
-        return [product.to_dict() for product in products_collection]
+        loader = _load_product_summaries if lean else _load_all_products
+        return catalog_cache.get_or_set(all_products_cache_key(lean), loader)
     except Exception as e:
-        current_app.logger.error(f"Error fetching products: {str(e)}")
+        current_app.logger.error("Error fetching products: %s", e)
         return []
 
+
+def _load_products_page(filters: Dict, sort: str, descending: bool, limit: int,
+                        cursor: Optional[str], lean: bool) -> Dict:
+    query = Product.query
+    if filters.get("category"):
+        query = query.filter(Product.category == filters["category"])
+    if filters.get("min_price") is not None:
+        query = query.filter(Product.price >= filters["min_price"])
+    if filters.get("max_price") is not None:
+        query = query.filter(Product.price <= filters["max_price"])
+    if filters.get("is_alcohol") is not None:
+        query = query.filter(Product.is_alcohol == filters["is_alcohol"])
+
+    sort_column = Product.average_rating if sort == "rating" else getattr(Product, sort)
+
+    if sort == "id":
+        key, order_by = Product.id, [Product.id]
+    else:
+        key, order_by = tuple_(sort_column, Product.id), [sort_column, Product.id]
+    if descending:
+        order_by = [column.desc() for column in order_by]
+
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("sort") != sort or position.get("desc") != descending:
+            raise ValueError("Cursor does not match the requested sort order")
+        boundary = cursor_field(position, "id", int)
+        if sort != "id":
+            boundary = tuple_(cursor_field(position, "value", SORT_VALUE_TYPES[sort]), boundary)
+        query = query.filter(key < boundary if descending else key > boundary)
+
+    query = query.add_columns(sort_column)
+    if not lean:
+        query = query.options(selectinload(Product.reviews))
+
+    rows = query.order_by(*order_by).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    products = [row[0] for row in rows]
+    items = serialize_products(products, lean=lean)
+
+    next_cursor = None
+    if has_more:
+        last_product, last_value = rows[-1]
+        next_cursor = encode_cursor({"sort": sort, "desc": descending, "value": last_value, "id": last_product.id})
+    return {"items": items, "next_cursor": next_cursor, "limit": limit}
+
+
+@replica_read
+def get_products_page(filters: Dict, sort: str = "id", descending: bool = False, limit: int = 50,
+                      cursor: Optional[str] = None, lean: bool = False) -> Dict:
+    """
+    Retrieves one page of products using keyset pagination.
+
+    Pages are addressed by an opaque cursor holding the sort value and ID of the last
+    product on the previous page, so every page is an index range scan no matter how
+    deep the client has paged.
+
+    Only the first page of each filter and sort is kept in the catalog cache. Later
+    pages are read from the database every time, so that clients paging deep into
+    the catalog cannot evict the entries every client shares.
+
+    Args:
+        filters (Dict): Optional `category`, `min_price`, `max_price` and `is_alcohol` filters.
+        sort (str): One of PRODUCT_SORTS.
+        descending (bool): Whether to sort in descending order.
+        limit (int): Maximum number of products on the page.
+        cursor (str, optional): The `next_cursor` returned with the previous page.
+        lean (bool): If True, return review count and average rating instead of reviews.
+
+    Returns:
+        Dict: The page items, the cursor for the next page (or None) and the page size.
+
+    Raises:
+        ValueError: If the sort field or the cursor is invalid.
+    """
+    if sort not in PRODUCT_SORTS:
+        raise ValueError(f"Invalid sort field: {sort}")
+    if cursor:
+        return _load_products_page(filters, sort, descending, limit, cursor, lean)
+    cache_key = products_page_cache_key(filters, sort, descending, limit, cursor, lean)
+    return catalog_cache.get_or_set(
+        cache_key, lambda: _load_products_page(filters, sort, descending, limit, cursor, lean)
+    )
+
+
+def _load_product(product_id: int) -> Dict:
+    product = Product.query.get(product_id)
+    return product.to_dict() if product else {}
+
+
+@replica_read
 def get_product_by_id(product_id: int) -> Dict:
     """
-    Retrieves a product by its ID.
+    Retrieves a product by its ID, serving it from the catalog cache when possible.
 
     Args:
         product_id (str): The ID of the product to retrieve.
@@ -31,14 +188,98 @@ def get_product_by_id(product_id: int) -> Dict:
     Returns:
         Dict: A dictionary representing the product if found, otherwise an empty dictionary.
     """
-    product = Product.query.get(product_id)
+    product = catalog_cache.get_or_set(product_cache_key(product_id), lambda: _load_product(product_id))
     if product:
-        current_app.logger.info(f"Product with ID {product_id} found.")
-        return product.to_dict()
-    current_app.logger.warning(f"Product with ID {product_id} not found.")
+        current_app.logger.info("Product with ID %s found.", product_id)
+        return product
+    current_app.logger.warning("Product with ID %s not found.", product_id)
     return {}
 
 
+def get_product_favorite_count(product_id: int) -> int:
+    """
+    Counts how many users have the product in their favorites.
+
+    Args:
+        product_id (int): The ID of the product.
+
+    Returns:
+        int: The number of users who favorited the product.
+    """
+    return db.session.query(func.count()).select_from(UserFavorite) \
+        .filter(UserFavorite.product_id == product_id).scalar()
+
+
+def _apply_review_delta(product_id: int, added_rating=None, removed_rating=None):
+    """
+    Updates a product's stored review aggregates for one review write.
+
+    The update is a single UPDATE ... SET col = col + delta statement executed in the
+    caller's transaction, so concurrent review writes cannot lose increments.
+
+    Args:
+        product_id (int): The ID of the product.
+        added_rating (float, optional): Rating of a review being added (or new rating of an edit).
+        removed_rating (float, optional): Rating of a review being removed (or old rating of an edit).
+    """
+    count_delta = (added_rating is not None) - (removed_rating is not None)
+    sum_delta = float(added_rating or 0) - float(removed_rating or 0)
+    new_count = Product.review_count + count_delta
+    new_sum = Product.rating_sum + sum_delta
+    values = {
+        "review_count": new_count,
+        "rating_sum": new_sum,
+        "average_rating": case((new_count > 0, new_sum / new_count), else_=0),
+    }
+    bucket_deltas = {}
+    for rating, delta in ((added_rating, 1), (removed_rating, -1)):
+        if rating is not None:
+            stars = rating_bucket(rating)
+            bucket_deltas[stars] = bucket_deltas.get(stars, 0) + delta
+    for stars, delta in bucket_deltas.items():
+        if delta:
+            column = getattr(Product, f"rating_{stars}_count")
+            values[column.key] = column + delta
+    db.session.execute(
+        update(Product).where(Product.id == product_id).values(**values),
+        execution_options={"synchronize_session": False}
+    )
+
+
+def recompute_review_aggregates() -> int:
+    """
+    Recomputes the stored review aggregates of every product from the reviews table.
+
+    Runs as a single set-based UPDATE with correlated subqueries, so it is safe to use
+    as a repair step after bulk loads or if the counters ever drift.
+
+    Returns:
+        int: The number of products updated.
+    """
+    def aggregate(expression, *criteria):
+        return select(expression).where(Review.product_id == Product.id, *criteria).scalar_subquery()
+
+    values = {
+        "review_count": aggregate(func.count(Review.id)),
+        "rating_sum": aggregate(func.coalesce(func.sum(Review.rating), 0)),
+        "average_rating": aggregate(func.coalesce(func.avg(Review.rating), 0)),
+    }
+    bounds = {1: (None, 1.5), 2: (1.5, 2.5), 3: (2.5, 3.5), 4: (3.5, 4.5), 5: (4.5, None)}
+    for stars, (low, high) in bounds.items():
+        criteria = []
+        if low is not None:
+            criteria.append(Review.rating >= low)
+        if high is not None:
+            criteria.append(Review.rating < high)
+        values[f"rating_{stars}_count"] = aggregate(func.count(Review.id), *criteria)
+
+    result = db.session.execute(update(Product).values(**values), execution_options={"synchronize_session": False})
+    db.session.commit()
+    invalidate_catalog_caches()
+    current_app.logger.info("Recomputed review aggregates for %s products.", result.rowcount)
+    return result.rowcount
+
+
 def add_review_to_product(product_id: int, review_data: Dict) -> Dict:
     """
     Adds a review to the specified product.
@@ -51,16 +292,16 @@ def add_review_to_product(product_id: int, review_data: Dict) -> Dict:
         Dict: A dictionary containing the result of the review submission.
     """
     product = Product.query.get(product_id)
-    current_app.logger.debug(f"Review data received: {review_data}")
+    current_app.logger.debug("Review data received: %s", review_data)
 
     if not product:
-        current_app.logger.error(f"Product with ID {product_id} not found.")
+        current_app.logger.error("Product with ID %s not found.", product_id)
         return {"error": "Product not found"}
 
     existing_review = Review.query.filter_by(product_id=product_id, author=review_data["author"]).first()
 
     if existing_review:
-        current_app.logger.warning(f"User {review_data['author']} has already reviewed product {product_id}.")
+        current_app.logger.warning("User %s has already reviewed product %s.", review_data['author'], product_id)
         return {"error": "User has already reviewed this product"}
 
     # Manually creating the review based on the dictionary data
@@ -72,9 +313,11 @@ def add_review_to_product(product_id: int, review_data: Dict) -> Dict:
     )
 
     db.session.add(new_review)
+    _apply_review_delta(product_id, added_rating=review_data["rating"])
     db.session.commit()
+    invalidate_catalog_caches()
 
-    current_app.logger.info(f"New review added for product {product_id} by {review_data['author']}.")
+    current_app.logger.info("New review added for product %s by %s.", product_id, review_data['author'])
     return {"message": "Review added successfully"}
 
 
@@ -83,11 +326,13 @@ def remove_review_from_product(product_id: int, author_name: str) -> Dict:
 
     if review:
         db.session.delete(review)
+        _apply_review_delta(product_id, removed_rating=review.rating)
         db.session.commit()
-        current_app.logger.info(f"Review by {author_name} for product {product_id} deleted successfully.")
+        invalidate_catalog_caches()
+        current_app.logger.info("Review by %s for product %s deleted successfully.", author_name, product_id)
         return {"message": "Review deleted successfully"}
 
-    current_app.logger.warning(f"Review by {author_name} for product {product_id} not found.")
+    current_app.logger.warning("Review by %s for product %s not found.", author_name, product_id)
     return {"error": "Review not found"}
 
 
@@ -95,11 +340,13 @@ def update_product_review(product_id: int, author_name: str, updated_data: Dict)
     review = Review.query.filter_by(product_id=product_id, author=author_name).first()
 
     if review:
+        _apply_review_delta(product_id, added_rating=updated_data["rating"], removed_rating=review.rating)
         review.rating = updated_data["rating"]
         review.comment = updated_data["comment"]
         db.session.commit()
-        current_app.logger.info(f"Updated review added for product {product_id} by {review.author}.")
+        invalidate_catalog_caches()
+        current_app.logger.info("Updated review added for product %s by %s.", product_id, review.author)
         return {"message": "Review updated successfully"}
 
-    current_app.logger.warning(f"Review by {author_name} for product {product_id} not found.")
+    current_app.logger.warning("Review by %s for product %s not found.", author_name, product_id)
     return {"error": "Review not found"}
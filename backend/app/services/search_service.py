@@ -0,0 +1,131 @@
+import re
+from sqlalchemy import text
+from sqlalchemy.orm import selectinload
+from typing import Dict, List, Optional
+from .. import db, search_cache
+from ..models.product_model import Product
+from .product_service import serialize_products
+from ..utils.pagination import cursor_field, encode_cursor, decode_cursor
+
+MAX_SEARCH_TERMS = 10
+
+# The search index is created by the 5b8d2f4e1a93 migration: an FTS5 table kept in
+# sync with `products` by triggers on SQLite, a GIN expression index on Postgres.
+# Postgres queries must use the exact expression the index was built on for the
+# planner to pick it.
+PG_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+# Lower score is better on both backends: bm25() is negative-is-better and the
+# Postgres rank is negated, so pages can be walked with one ascending keyset.
+SQLITE_SEARCH_QUERY = """
+    SELECT id, score FROM (
+        SELECT rowid AS id, bm25(products_fts, 10.0, 1.0, 5.0) AS score
+        FROM products_fts WHERE products_fts MATCH :query
+    )
+    WHERE :after_score IS NULL OR (score, id) > (:after_score, :after_id)
+    ORDER BY score, id
+    LIMIT :limit
+"""
+
+PG_SEARCH_QUERY = f"""
+    SELECT id, score FROM (
+        SELECT id, -ts_rank({PG_SEARCH_DOCUMENT}, to_tsquery('english', :query)) AS score
+        FROM products WHERE {PG_SEARCH_DOCUMENT} @@ to_tsquery('english', :query)
+    ) AS matches
+    WHERE CAST(:after_score AS double precision) IS NULL OR (score, id) > (:after_score, :after_id)
+    ORDER BY score, id
+    LIMIT :limit
+"""
+
+
+def _is_sqlite() -> bool:
+    return db.engine.dialect.name == "sqlite"
+
+
+def rebuild_search_index():
+    """
+    Rebuilds the full-text search index from the products table.
+
+    On SQLite this repopulates the FTS5 table. On Postgres it rebuilds the GIN index
+    without blocking writes, which also repairs an index left invalid by an
+    interrupted CREATE INDEX CONCURRENTLY.
+    """
+    if _is_sqlite():
+        db.session.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+        db.session.commit()
+        return
+    # REINDEX CONCURRENTLY cannot run inside a transaction.
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("REINDEX INDEX CONCURRENTLY ix_products_search"))
+
+
+def _build_match_query(terms: List[str]) -> str:
+    if _is_sqlite():
+        return " ".join(f'"{term}"*' for term in terms)
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def _load_search_page(terms: List[str], limit: int, cursor: Optional[str], lean: bool) -> Dict:
+    after_score = after_id = None
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("search") != terms:
+            raise ValueError("Cursor does not match the search query")
+        after_score = float(cursor_field(position, "score", (int, float)))
+        after_id = cursor_field(position, "id", int)
+
+    rows = db.session.execute(
+        text(SQLITE_SEARCH_QUERY if _is_sqlite() else PG_SEARCH_QUERY),
+        {
+            "query": _build_match_query(terms),
+            "after_score": after_score,
+            "after_id": after_id,
+            "limit": limit + 1,
+        }
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    query = Product.query.filter(Product.id.in_([row.id for row in rows]))
+    if not lean:
+        query = query.options(selectinload(Product.reviews))
+    products_by_id = {product.id: product for product in query}
+    products = [products_by_id[row.id] for row in rows if row.id in products_by_id]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor({"search": terms, "score": rows[-1].score, "id": rows[-1].id})
+    return {"items": serialize_products(products, lean=lean), "next_cursor": next_cursor, "limit": limit}
+
+
+def search_products(query: str, limit: int = 20, cursor: Optional[str] = None, lean: bool = False) -> Dict:
+    """
+    Searches product names, descriptions and categories using the full-text index.
+
+    Every word in the query must match, as a prefix, in one of the indexed fields.
+    Results are ranked with name matches weighted above category and description
+    matches, and paginated with a (score, id) keyset cursor. Only first pages are
+    cached, in the bounded search cache.
+
+    Args:
+        query (str): The user's search text.
+        limit (int): Maximum number of products on the page.
+        cursor (str, optional): The `next_cursor` returned with the previous page.
+        lean (bool): If True, return review count and average rating instead of reviews.
+
+    Returns:
+        Dict: The page items, the cursor for the next page (or None) and the page size.
+
+    Raises:
+        ValueError: If the query has no searchable words or the cursor is invalid.
+    """
+    terms = re.findall(r"\w+", query.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        raise ValueError("Search query must contain at least one word")
+    if cursor:
+        return _load_search_page(terms, limit, cursor, lean)
+    return search_cache.get_or_set((tuple(terms), limit, lean), lambda: _load_search_page(terms, limit, None, lean))
@@ -0,0 +1,448 @@
+import io
+import random
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+from flask import current_app
+from sqlalchemy import Boolean, func, select, text, update
+from .. import db, password_hasher, user_profile_cache
+from ..models.order_model import Order, OrderItem
+from ..models.product_model import Product, Review, rating_bucket
+from ..models.user_model import User, BasketItem, UserPurchase
+from ..utils.sql import upsert_insert
+from .product_service import invalidate_catalog_caches, recompute_review_aggregates
+from .search_service import rebuild_search_index
+from .user_service import migrate_legacy_product_lists
+
+DEFAULT_BATCH_SIZE = 10000
+
+_INSERT = re.compile(r"INSERT\s+INTO\s+(?:\w+\.)?\"?(\w+)\"?\s*(?:\(([^)]*)\))?\s*VALUES\s*", re.IGNORECASE)
+_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?\"?(\w+)\"?\s*\((.*?)\);",
+                           re.IGNORECASE | re.DOTALL)
+_VALUE_TOKEN = re.compile(r"\s*(?:'((?:[^']|'')*)'|(NULL|TRUE|FALSE)|(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)|([(),;]))",
+                          re.IGNORECASE)
+_CONSTRAINT_PREFIXES = ("FOREIGN", "PRIMARY", "UNIQUE", "CHECK", "CONSTRAINT", "--")
+
+PRODUCT_CATEGORIES = [
+    "Alcohol", "Bakery", "Chilled", "Cleaning House", "Fish", "Food Cupboard",
+    "Fresh Vegetables", "Frozen Foods", "Meat & Poultry", "Meat Free", "Pet Care",
+]
+_PRODUCT_ADJECTIVES = ["Fresh", "Organic", "Classic", "Smoked", "Crunchy", "Mild", "Extra", "Family",
+                       "Free Range", "Wholegrain", "Sweet", "Spicy", "Light", "Premium", "Value"]
+_PRODUCT_NOUNS = ["Apples", "Bread", "Cheddar", "Salmon", "Chicken", "Pasta", "Rice", "Yoghurt",
+                  "Beans", "Soup", "Crisps", "Coffee", "Tea", "Lager", "Cider", "Detergent",
+                  "Dog Food", "Peas", "Pizza", "Tofu", "Sausages", "Butter", "Milk", "Eggs"]
+_REVIEW_COMMENTS = ["Great value.", "Would buy again.", "Not as good as last time.", "Tastes fresh.",
+                    "Arrived damaged.", "Good quality for the price.", "Too expensive.", "Lovely!",
+                    "Average.", "My family loves it.", None]
+# Ratings skew positive, as real reviews do.
+_RATING_WEIGHTS = {1: 1, 2: 1, 3: 2, 4: 3, 5: 3}
+
+
+class DumpParseError(ValueError):
+    """Raised when an INSERT statement of a SQL dump cannot be parsed."""
+
+
+def _parse_value(token: re.Match):
+    quoted, keyword, number, _ = token.groups()
+    if quoted is not None:
+        return quoted.replace("''", "'")
+    if keyword is not None:
+        return {"null": None, "true": True, "false": False}[keyword.lower()]
+    if any(marker in number for marker in ".eE"):
+        return float(number)
+    return int(number)
+
+
+def _parse_rows(values: str, position: int) -> List[tuple]:
+    rows, row, depth = [], [], 0
+    while position < len(values):
+        token = _VALUE_TOKEN.match(values, position)
+        if token is None:
+            raise DumpParseError(f"Unexpected input in VALUES: {values[position:position + 40]!r}")
+        position = token.end()
+        punctuation = token.group(4)
+        if punctuation == "(":
+            depth, row = depth + 1, []
+        elif punctuation == ")":
+            depth -= 1
+            rows.append(tuple(row))
+        elif punctuation == ";":
+            break
+        elif punctuation is None:
+            row.append(_parse_value(token))
+    if depth:
+        raise DumpParseError("Unbalanced parentheses in VALUES.")
+    return rows
+
+
+def _dump_statements(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8-sig") as dump:
+        statement = []
+        for line in dump:
+            if not statement and (not line.strip() or line.startswith("--")):
+                continue
+            statement.append(line)
+            joined = "".join(statement).rstrip()
+            # A statement ends at a ';' that is not inside a string literal.
+            if joined.endswith(";") and joined.count("'") % 2 == 0:
+                yield joined
+                statement = []
+        if statement:
+            yield "".join(statement)
+
+
+def parse_sql_dump(path: str) -> Dict[str, Tuple[List[str], List[tuple]]]:
+    """
+    Reads the rows of the INSERT statements of a SQL dump.
+
+    Handles both pg_dump's `INSERT INTO t (columns) VALUES (...)` and SQLite's
+    `INSERT INTO t VALUES(...)`. Without a column list, the column order is taken
+    from the dump's own CREATE TABLE statement, which need not match the models.
+
+    Args:
+        path (str): The dump file.
+
+    Returns:
+        Dict[str, Tuple[List[str], List[tuple]]]: For each table, its columns and rows.
+
+    Raises:
+        DumpParseError: If a statement cannot be parsed.
+    """
+    dump_columns = {}
+    tables = {}
+    for statement in _dump_statements(path):
+        create = _CREATE_TABLE.match(statement)
+        if create:
+            columns = []
+            for definition in create.group(2).split(","):
+                words = definition.split()
+                if words and not words[0].upper().startswith(_CONSTRAINT_PREFIXES):
+                    columns.append(words[0].strip('"'))
+            dump_columns[create.group(1)] = columns
+            continue
+        insert = _INSERT.match(statement)
+        if not insert:
+            continue
+        table = insert.group(1)
+        if insert.group(2):
+            columns = [column.strip().strip('"') for column in insert.group(2).split(",")]
+        elif table in dump_columns:
+            columns = dump_columns[table]
+        else:
+            raise DumpParseError(f"INSERT INTO {table} has no column list and no CREATE TABLE.")
+        known_columns, rows = tables.setdefault(table, (columns, []))
+        if known_columns != columns:
+            raise DumpParseError(f"INSERTs into {table} use different column lists.")
+        rows.extend(_parse_rows(statement, insert.end()))
+    return tables
+
+
+def _csv_field(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+def _copy_rows(connection, table: str, columns: Sequence[str], rows: List[tuple]):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_csv_field(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def _placeholder(connection) -> str:
+    return "%s" if connection.dialect.paramstyle in ("format", "pyformat") else "?"
+
+
+def bulk_insert(connection, table: str, columns: Sequence[str], rows: Iterable[tuple],
+                batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Inserts rows in batches with the fastest path the database offers.
+
+    On Postgres each batch is streamed with `COPY ... FROM STDIN`; elsewhere it is a
+    single `executemany` of a driver-level INSERT, which skips the ORM and the
+    per-row statement compilation.
+
+    Args:
+        connection (Connection): The connection to insert on; the caller commits.
+        table (str): The table name.
+        columns (Sequence[str]): The column names, in the order of the row tuples.
+        rows (Iterable[tuple]): The rows; may be a generator, consumed batch by batch.
+        batch_size (int): The number of rows sent per round trip.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    use_copy = connection.dialect.name == "postgresql"
+    placeholder = _placeholder(connection)
+    statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+    inserted = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            inserted += _flush(connection, use_copy, statement, table, columns, batch)
+            batch = []
+    if batch:
+        inserted += _flush(connection, use_copy, statement, table, columns, batch)
+    return inserted
+
+
+def _flush(connection, use_copy: bool, statement: str, table: str, columns: Sequence[str], batch: List[tuple]) -> int:
+    if use_copy:
+        _copy_rows(connection, table, columns, batch)
+    else:
+        connection.exec_driver_sql(statement, batch)
+    return len(batch)
+
+
+def reset_id_sequences(connection, tables: Iterable[str]):
+    """
+    Moves the Postgres id sequences past the largest id of each table, after rows
+    were inserted with explicit ids. SQLite needs nothing.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    for table in tables:
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+        ))
+
+
+def _coerce_row(row: tuple, converters: List) -> tuple:
+    return tuple(value if convert is None or value is None else convert(value)
+                 for value, convert in zip(row, converters))
+
+
+def _finish_load(connection, tables: Iterable[str], recompute_reviews: bool = True):
+    reset_id_sequences(connection, [table for table in tables if "id" in db.metadata.tables[table].c])
+    migrate_legacy_product_lists(connection)
+    db.session.commit()
+    if recompute_reviews:
+        recompute_review_aggregates()
+    else:
+        invalidate_catalog_caches()
+    rebuild_search_index()
+    user_profile_cache.clear()
+
+
+def load_sql_dump(path: str, replace: bool = False, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Loads the rows of a SQL dump (e.g. data_dump.sql or app/sqlite_dump_clean.sql)
+    into the current database.
+
+    Tables are loaded parent-first whatever their order in the dump; tables and
+    columns the models do not know (alembic_version, legacy columns) are skipped.
+    Afterwards the legacy product lists are migrated, the review aggregates are
+    recomputed and the search index is rebuilt. Everything but those repair steps
+    runs in one transaction.
+
+    Args:
+        path (str): The dump file.
+        replace (bool): Delete all existing rows of every table first.
+        batch_size (int): The number of rows sent per round trip.
+
+    Returns:
+        Dict[str, int]: The number of rows loaded per table.
+    """
+    dump = parse_sql_dump(path)
+    connection = db.session.connection()
+    tables = [table for table in db.metadata.sorted_tables if table.name in dump]
+    if replace:
+        for table in reversed(db.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+    loaded = {}
+    for table in tables:
+        columns, rows = dump[table.name]
+        keep = [index for index, column in enumerate(columns) if column in table.c]
+        names = [columns[index] for index in keep]
+        converters = [bool if isinstance(table.c[name].type, Boolean) else None for name in names]
+        loaded[table.name] = bulk_insert(
+            connection, table.name, names,
+            (_coerce_row(tuple(row[index] for index in keep), converters) for row in rows),
+            batch_size,
+        )
+    _finish_load(connection, loaded)
+    current_app.logger.info("Loaded %s: %s", path, loaded)
+    return loaded
+
+
+def _next_id(connection, model) -> int:
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def generate_synthetic_data(users: int = 0, products: int = 0, reviews: int = 0, baskets: int = 0,
+                            purchases: int = 0, seed: int = 0, password: str = "password",
+                            batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Adds generated users, products, reviews, baskets and purchases to the database.
+
+    The same seed and counts always produce the same rows on the same starting data,
+    so benchmarks can be repeated at a known scale. New rows get ids after the current
+    maximum and are streamed in batches, so millions of reviews never sit in memory.
+
+    Args:
+        users (int): Users to create, named `user<id>` with email `user<id>@example.com`.
+        products (int): Products to create.
+        reviews (int): Reviews to create, spread over all products and users.
+        baskets (int): Users without a basket that get one of 1-8 products.
+        purchases (int): Orders to create, of 1-5 products each, recorded as purchases.
+        seed (int): Seed of the random generator.
+        password (str): The password of every generated user; hashed once.
+        batch_size (int): The number of rows sent per round trip.
+
+    Returns:
+        Dict[str, int]: The number of rows inserted per table.
+    """
+    rng = random.Random(seed)
+    connection = db.session.connection()
+    inserted = {}
+
+    if users:
+        first_id = _next_id(connection, User)
+        password_hash = password_hasher.hash(password)
+        inserted["users"] = bulk_insert(connection, "users", ("id", "username", "email", "password"), (
+            (user_id, f"user{user_id}", f"user{user_id}@example.com", password_hash)
+            for user_id in range(first_id, first_id + users)
+        ), batch_size)
+
+    if products:
+        first_id = _next_id(connection, Product)
+        image_urls = list(connection.execute(
+            select(Product.image_url).where(Product.image_url.isnot(None)).distinct().order_by(Product.image_url)
+        ).scalars()) or [None]
+        inserted["products"] = bulk_insert(
+            connection, "products", ("id", "name", "description", "price", "category", "image_url", "is_alcohol"), (
+                (product_id,
+                 f"{rng.choice(_PRODUCT_ADJECTIVES)} {rng.choice(_PRODUCT_NOUNS)} {product_id}",
+                 "",
+                 round(rng.uniform(0.3, 30), 2),
+                 category,
+                 rng.choice(image_urls),
+                 category == "Alcohol")
+                for product_id, category in ((product_id, rng.choice(PRODUCT_CATEGORIES))
+                                             for product_id in range(first_id, first_id + products))
+            ), batch_size)
+
+    user_rows = connection.execute(select(User.id, User.username).order_by(User.id)).all()
+    product_rows = connection.execute(select(Product.id, Product.name, Product.price).order_by(Product.id)).all()
+    if (reviews or baskets or purchases) and not (user_rows and product_rows):
+        raise ValueError("Reviews, baskets and purchases need at least one user and one product.")
+
+    if reviews:
+        first_id = _next_id(connection, Review)
+        histogram = Counter()
+        inserted["reviews"] = bulk_insert(
+            connection, "reviews", ("id", "product_id", "author", "rating", "comment"),
+            _review_rows(rng, first_id, reviews, [product.id for product in product_rows],
+                         [username for _, username in user_rows], histogram, batch_size),
+            batch_size)
+        _add_review_aggregates(connection, histogram)
+
+    if baskets:
+        with_basket = set(connection.execute(select(BasketItem.user_id).distinct()).scalars())
+        candidates = [user_id for user_id, _ in user_rows if user_id not in with_basket]
+        first_id = _next_id(connection, BasketItem)
+        basket_rows = (
+            (user_id, product.id, rng.randint(1, 5))
+            for user_id in rng.sample(candidates, min(baskets, len(candidates)))
+            for product in rng.sample(product_rows, min(rng.randint(1, 8), len(product_rows)))
+        )
+        inserted["basket_items"] = bulk_insert(
+            connection, "basket_items", ("id", "user_id", "product_id", "quantity"),
+            ((item_id, *row) for item_id, row in enumerate(basket_rows, first_id)), batch_size)
+
+    if purchases:
+        inserted.update(_generate_orders(connection, rng, purchases, [user_id for user_id, _ in user_rows],
+                                         product_rows, batch_size))
+
+    _finish_load(connection, inserted, recompute_reviews=False)
+    current_app.logger.info("Generated synthetic data with seed %s: %s", seed, inserted)
+    return inserted
+
+
+def _review_rows(rng: random.Random, first_id: int, count: int, product_ids: List[int], authors: List[str],
+                 histogram: Counter, batch_size: int) -> Iterator[tuple]:
+    """
+    Yields generated reviews, drawing each column a batch at a time, and counts them
+    per (product, stars) into `histogram`.
+    """
+    ratings = [float(rating) for rating, weight in _RATING_WEIGHTS.items() for _ in range(weight)]
+    for start in range(first_id, first_id + count, batch_size):
+        size = min(batch_size, first_id + count - start)
+        batch_products = rng.choices(product_ids, k=size)
+        batch_ratings = rng.choices(ratings, k=size)
+        histogram.update(zip(batch_products, batch_ratings))
+        yield from zip(range(start, start + size), batch_products, rng.choices(authors, k=size), batch_ratings,
+                       rng.choices(_REVIEW_COMMENTS, k=size))
+
+
+def _add_review_aggregates(connection, histogram: Counter):
+    """
+    Adds the counts of newly inserted reviews to the stored product aggregates, which
+    is much cheaper than recomputing them from millions of review rows.
+    """
+    deltas = defaultdict(lambda: [0, 0.0, 0, 0, 0, 0, 0])
+    for (product_id, rating), count in histogram.items():
+        delta = deltas[product_id]
+        delta[0] += count
+        delta[1] += rating * count
+        delta[1 + rating_bucket(rating)] += count
+    columns = ["review_count", "rating_sum"] + [f"rating_{stars}_count" for stars in range(1, 6)]
+    placeholder = _placeholder(connection)
+    assignments = ", ".join(f"{column} = {column} + {placeholder}" for column in columns)
+    connection.exec_driver_sql(f"UPDATE products SET {assignments} WHERE id = {placeholder}",
+                               [(*delta, product_id) for product_id, delta in sorted(deltas.items())])
+    connection.execute(
+        update(Product).where(Product.review_count > 0)
+        .values(average_rating=Product.rating_sum / Product.review_count)
+    )
+
+
+def _generate_orders(connection, rng: random.Random, count: int, user_ids: List[int], product_rows: List,
+                     batch_size: int) -> Dict[str, int]:
+    first_order_id = _next_id(connection, Order)
+    first_item_id = _next_id(connection, OrderItem)
+    orders, items, purchased = [], [], set()
+    inserted = defaultdict(int)
+
+    def flush():
+        inserted["orders"] += bulk_insert(connection, "orders", ("id", "user_id", "total"), orders, batch_size)
+        inserted["order_items"] += bulk_insert(
+            connection, "order_items", ("id", "order_id", "product_id", "product_name", "unit_price", "quantity"),
+            items, batch_size)
+        orders.clear()
+        items.clear()
+
+    for order_id in range(first_order_id, first_order_id + count):
+        user_id = rng.choice(user_ids)
+        total = 0.0
+        for product in rng.sample(product_rows, min(rng.randint(1, 5), len(product_rows))):
+            quantity = rng.randint(1, 3)
+            items.append((first_item_id, order_id, product.id, product.name, product.price, quantity))
+            first_item_id += 1
+            total += product.price * quantity
+            purchased.add((user_id, product.id))
+        orders.append((order_id, user_id, round(total, 2)))
+        if len(items) >= batch_size:
+            flush()
+    flush()
+
+    # Purchases may already exist for older orders, so these go through ON CONFLICT
+    # rather than COPY.
+    purchase_rows = [{"user_id": user_id, "product_id": product_id} for user_id, product_id in sorted(purchased)]
+    insert = upsert_insert(UserPurchase, connection.dialect.name).on_conflict_do_nothing()
+    for start in range(0, len(purchase_rows), batch_size):
+        connection.execute(insert, purchase_rows[start:start + batch_size])
+    inserted["user_purchases"] = len(purchase_rows)
+    return dict(inserted)
@@ -1,17 +1,26 @@
 import os
+import re
+import tempfile
 from flask import current_app
-from werkzeug.utils import secure_filename
-from typing import List, Dict
-from sqlalchemy import cast, ARRAY, Integer
-from .. import db
-from ..models.user_model import User, BasketItem
+from typing import List, Dict, Optional
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import selectinload
+from .. import avatar_storage, db, user_profile_cache
+from ..models.user_model import User, BasketItem, UserFavorite, UserPurchase
 from ..models.product_model import Product
+from ..utils.images import InvalidImage, UploadTooLarge, render_square_variants, stream_to_file
+from ..utils.replicas import replica_read
+from ..utils.sql import upsert_insert
 
 
-UPLOAD_FOLDER = os.path.join(os.getcwd(), 'avatar')
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+# Processed avatars are stored as '<digest>-<size>.<format>' and referenced by users
+# as '<digest>.<format>'.
+CONTENT_ADDRESSED_AVATAR = re.compile(r'[0-9a-f]{32}\.[a-z]+')
+CONTENT_ADDRESSED_VARIANT = re.compile(r'([0-9a-f]{32})-\d+\.([a-z]+)')
 
 
+@replica_read
 def get_all_users() -> list:
     """
     Retrieves all users from the database.
@@ -30,58 +39,102 @@ def get_all_users() -> list:
             "avatar": user.avatar if user.avatar else 'user_default.png',
         })
 
-    current_app.logger.info(f"Retrieved {len(users)} users.")
+    current_app.logger.info("Retrieved %s users.", len(users))
     return user_list
 
-def get_user_info(user_id: int) -> dict:
+
+def user_profile_cache_key(user_id: int) -> tuple:
+    return ("user_profile", int(user_id))
+
+
+def load_user_profile(user_id: int) -> Optional[Dict]:
+    """
+    Retrieves the user's profile, loading only the id, username, email and avatar
+    columns. Profiles are kept in the short-lived per-process user profile cache, and
+    missing users are not cached.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        dict: The user's profile, or None if the user does not exist.
+    """
+    key = user_profile_cache_key(user_id)
+    profile = user_profile_cache.get(key)
+    if profile is not None:
+        return profile
+
+    version = user_profile_cache.version
+    row = db.session.execute(
+        select(User.id, User.username, User.email, User.avatar).where(User.id == int(user_id))
+    ).first()
+    if row is None:
+        return None
+    profile = dict(row._mapping)
+    user_profile_cache.set(key, profile, version=version)
+    return profile
+
+
+def invalidate_user_profile(user_id: int):
+    """
+    Drops the user's cached profile. Call after any write to the profile columns.
+    """
+    user_profile_cache.delete(user_profile_cache_key(user_id))
+
+
+def get_user_info(user_id: int, profile: Optional[Dict] = None) -> dict:
     """
     Retrieves the user's information from the database.
 
     Args:
         user_id (str): The ID of the user.
+        profile (dict, optional): The user's profile, if already loaded for this request.
 
     Returns:
         dict: A dictionary containing the user's information.
     """
-    user = User.query.get(user_id)
-    if user:
-        current_app.logger.info(f"Retrieved info for user {user.username} (ID: {user_id})")
+    profile = profile or load_user_profile(user_id)
+    if profile:
+        current_app.logger.info("Retrieved info for user %s (ID: %s)", profile['username'], user_id)
+        basket_items = BasketItem.query.filter_by(user_id=profile["id"]).order_by(BasketItem.id).all()
         return {
-            "username": user.username,
-            "email": user.email,
-            "fav_products": user.fav_products,
-            "basket": [item.to_dict() for item in user.basket_items],
-            "purchased_products": user.purchased_products,
-            "avatar": user.avatar
+            "username": profile["username"],
+            "email": profile["email"],
+            "fav_products": _product_id_list(UserFavorite, profile["id"]),
+            "basket": [item.to_dict() for item in basket_items],
+            "purchased_products": _product_id_list(UserPurchase, profile["id"]),
+            "avatar": profile["avatar"]
         }
-    current_app.logger.warning(f"User with ID {user_id} not found.")
+    current_app.logger.warning("User with ID %s not found.", user_id)
     return {}
 
 
 def add_to_favorites(user_id: int, product_id: int) -> dict:
-    user = User.query.get(user_id)
-    if not user:
-        current_app.logger.error(f"User with ID {user_id} not found.")
-        return {"error": "User not found"}
-
-    fav_products = [int(p) for p in user.fav_products.split(',')] if user.fav_products else []
-
-    if product_id not in fav_products:
-        fav_products.append(product_id)
-        user.fav_products = ','.join(map(str, fav_products))
-        current_app.logger.info(f"Adding product {product_id} to user {user_id}'s favorites.")
+    """
+    Adds a product to the user's favorites with a single INSERT ... ON CONFLICT DO NOTHING.
 
-        try:
-            db.session.commit()
-            current_app.logger.info(f"Product {product_id} added to favorites for user {user_id}.")
-        except Exception as e:
-            db.session.rollback()
-            current_app.logger.error(f"Error adding product {product_id} to favorites for user {user_id}: {e}")
-            return {"error": "Failed to save changes"}
+    Args:
+        user_id (int): The ID of the user.
+        product_id (int): The ID of the product to add.
 
-        return {"message": "Product added to favorites"}
+    Returns:
+        dict: A message indicating the result, or an error.
+    """
+    statement = upsert_insert(UserFavorite, db.engine.dialect.name) \
+        .values(user_id=user_id, product_id=product_id) \
+        .on_conflict_do_nothing()
+    try:
+        result = db.session.execute(statement)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("Error adding product %s to favorites for user %s: %s", product_id, user_id, e)
+        return {"error": "Failed to save changes"}
 
-    return {"message": "Product already in favorites"}
+    if result.rowcount == 0:
+        return {"message": "Product already in favorites"}
+    current_app.logger.info("Product %s added to favorites for user %s.", product_id, user_id)
+    return {"message": "Product added to favorites"}
 
 
 def remove_from_favorites(user_id: int, product_id: int) -> dict:
@@ -95,28 +148,19 @@ def remove_from_favorites(user_id: int, product_id: int) -> dict:
     Returns:
         dict: The raw result of the update operation.
     """
-    user = User.query.get(user_id)
-    if not user:
-        current_app.logger.error(f"User with ID {user_id} not found.")
-        return {"error": "User not found"}
-
-    fav_products = [int(p) for p in user.fav_products.split(',')] if user.fav_products else []
-
-    if product_id in fav_products:
-        fav_products.remove(product_id)
-        user.fav_products = ','.join(map(str, fav_products))
-        current_app.logger.info(f"Removing product {product_id} from user {user_id}'s favorites.")
+    try:
+        deleted = UserFavorite.query.filter_by(user_id=user_id, product_id=product_id).delete()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("Error removing product %s from favorites for user %s: %s", product_id, user_id, e)
+        return {"error": "Failed to save changes"}
 
-        try:
-            db.session.commit()
-            current_app.logger.info(f"Product {product_id} removed from favorites for user {user_id}.")
-            return {"message": "Product removed from favorites"}
-        except Exception as e:
-            db.session.rollback()
-            current_app.logger.error(f"Error removing product {product_id} from favorites for user {user_id}: {e}")
-            return {"error": "Failed to save changes"}
+    if deleted:
+        current_app.logger.info("Product %s removed from favorites for user %s.", product_id, user_id)
+        return {"message": "Product removed from favorites"}
 
-    current_app.logger.warning(f"Product {product_id} not found in user {user_id}'s favorites.")
+    current_app.logger.warning("Product %s not found in user %s's favorites.", product_id, user_id)
     return {"error": "Product not found in favorites"}
 
 
@@ -130,20 +174,23 @@ def get_user_favorites(user_id: int) -> list:
     Returns:
         list: A list of dictionaries, each representing a favorite product.
     """
-    user = User.query.get(user_id)
-    if user:
-        fav_products = [int(p) for p in user.fav_products.split(',')] if user.fav_products else []
-        favorite_products = Product.query.filter(Product.id.in_(fav_products)).all()
-        current_app.logger.info(f"Fetched {len(favorite_products)} favorite products for user {user_id}.")
-        return [product.to_dict() for product in favorite_products]
-    current_app.logger.warning(f"No favorites found for user {user_id}.")
-    return []
+    favorite_products = Product.query.options(selectinload(Product.reviews)) \
+        .join(UserFavorite, UserFavorite.product_id == Product.id) \
+        .filter(UserFavorite.user_id == user_id) \
+        .order_by(UserFavorite.created_at, Product.id).all()
+    current_app.logger.info("Fetched %s favorite products for user %s.", len(favorite_products), user_id)
+    return [product.to_dict() for product in favorite_products]
 
 
 def sync_basket_service(user_id: int, basket: List[Dict]) -> dict:
     """
     Synchronizes the user's basket with the provided basket data in the database.
 
+    The sync is set-based: one DELETE for every product no longer in the basket and one
+    multi-row INSERT ... ON CONFLICT DO UPDATE for the incoming items, all in a single
+    transaction regardless of the basket size. The user is checked against the
+    (usually cached) user profile instead of a separate read.
+
     Args:
         user_id (str): The ID of the user.
         basket (List[Dict]): The basket data to synchronize.
@@ -151,41 +198,35 @@ def sync_basket_service(user_id: int, basket: List[Dict]) -> dict:
     Returns:
         dict: A message indicating the result of the synchronization.
     """
-    user = User.query.get(user_id)
-    if not user:
-        current_app.logger.error(f"User with ID {user_id} not found.")
+    if not load_user_profile(user_id):
+        current_app.logger.error("User with ID %s not found.", user_id)
         return {"error": "User not found"}
 
-    existing_items = BasketItem.query.filter_by(user_id=user_id).all()
-    existing_product_ids = {item.product_id for item in existing_items}
-    incoming_product_ids = {item['product_id'] for item in basket}
-
-    items_to_delete = existing_product_ids - incoming_product_ids
-    current_app.logger.info(f"Syncing basket for user {user_id}. Items to delete: {items_to_delete}")
-
-    for product_id in items_to_delete:
-        item_to_delete = BasketItem.query.filter_by(user_id=user_id, product_id=product_id).first()
-        if item_to_delete:
-            db.session.delete(item_to_delete)
-            current_app.logger.info(f"Deleted item with product_id {product_id} for user {user_id}")
-
-    for item in basket:
-        product_id = item['product_id']
-        existing_item = BasketItem.query.filter_by(user_id=user_id, product_id=product_id).first()
-
-        if existing_item:
-            existing_item.quantity = item['quantity']
-            current_app.logger.info(f"Updated item {product_id} to quantity {item['quantity']} for user {user_id}")
-        else:
-            new_item = BasketItem(user_id=user_id, product_id=product_id, quantity=item['quantity'])
-            db.session.add(new_item)
-            current_app.logger.info(f"Added new item {product_id} with quantity {item['quantity']} for user {user_id}")
+    quantities = {item['product_id']: item['quantity'] for item in basket}
+    current_app.logger.info("Syncing basket for user %s with %s items.", user_id, len(quantities))
 
     try:
+        BasketItem.query.filter(
+            BasketItem.user_id == user_id,
+            BasketItem.product_id.not_in(quantities.keys())
+        ).delete(synchronize_session=False)
+
+        if quantities:
+            statement = upsert_insert(BasketItem, db.engine.dialect.name).values([
+                {"user_id": user_id, "product_id": product_id, "quantity": quantity}
+                for product_id, quantity in quantities.items()
+            ])
+            statement = statement.on_conflict_do_update(
+                index_elements=[BasketItem.user_id, BasketItem.product_id],
+                set_={"quantity": statement.excluded.quantity}
+            )
+            db.session.execute(statement)
+
         db.session.commit()
-        current_app.logger.info(f"Basket successfully synced for user {user_id}")
+        current_app.logger.info("Basket successfully synced for user %s", user_id)
     except Exception as e:
-        current_app.logger.error(f"Error syncing basket for user {user_id}: {e}")
+        db.session.rollback()
+        current_app.logger.error("Error syncing basket for user %s: %s", user_id, e)
         return {"error": "Failed to update basket"}
 
     return {"message": "Basket successfully updated."}
@@ -195,26 +236,30 @@ def get_user_basket(user_id: int) -> List[Dict]:
     """
     Retrieves the user's current basket from the database.
 
+    Items are joined to their products in a single query that selects only the
+    columns the basket view needs.
+
     Args:
         user_id (str): The ID of the user.
 
     Returns:
         List[Dict]: The user's basket.
     """
-    basket_items = BasketItem.query.filter_by(user_id=user_id).all()
-
-    basket_with_details = []
-    for item in basket_items:
-        product = Product.query.get(item.product_id)
-        if product:
-            basket_with_details.append({
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "name": product.name,
-                "price": product.price,
-                "image_url": product.image_url,
-            })
-    current_app.logger.info(f"Fetched basket details for user {user_id}.")
+    basket_items = db.session.query(
+        BasketItem.product_id, BasketItem.quantity, Product.name, Product.price, Product.image_url
+    ).join(BasketItem.product).filter(BasketItem.user_id == user_id).order_by(BasketItem.id).all()
+
+    basket_with_details = [
+        {
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "name": item.name,
+            "price": item.price,
+            "image_url": item.image_url,
+        }
+        for item in basket_items
+    ]
+    current_app.logger.info("Fetched basket details for user %s.", user_id)
     return basket_with_details
 
 
@@ -233,95 +278,183 @@ def remove_from_basket_service(user_id: int, product_id: int) -> dict:
     if basket_item:
         db.session.delete(basket_item)
         db.session.commit()
-        current_app.logger.info(f"Removed product {product_id} from user {user_id}'s basket.")
+        current_app.logger.info("Removed product %s from user %s's basket.", product_id, user_id)
         return {"message": "Product removed from basket"}
 
-    current_app.logger.warning(f"Product {product_id} not found in user {user_id}'s basket.")
+    current_app.logger.warning("Product %s not found in user %s's basket.", product_id, user_id)
     return {"error": "Product not found in basket"}
 
 
-def add_product_to_purchased(user_id: int, product_ids: List[int]) -> dict:
+def record_purchases(user_id: int, product_ids: List[int]):
     """
-    Adds a product to the user's set of purchased products.
+    Adds products to the user's purchase history without committing.
+
+    Already purchased products are skipped by the database (ON CONFLICT DO NOTHING),
+    so this is a single INSERT regardless of the user's purchase history size.
+
+    Args:
+        user_id (int): The ID of the user.
+        product_ids (List[int]): The IDs of the products to add.
+    """
+    if product_ids:
+        statement = upsert_insert(UserPurchase, db.engine.dialect.name) \
+            .values([{"user_id": user_id, "product_id": product_id} for product_id in set(product_ids)]) \
+            .on_conflict_do_nothing()
+        db.session.execute(statement)
+
+
+@replica_read
+def get_user_purchased_products(user_id: int) -> List[int]:
+    """
+    Retrieves the IDs of the products the user has purchased.
     Args:
         user_id (str): The ID of the user.
-        product_ids (str): The ID of the product to add.
     Returns:
-        dict: The raw result of the update operation.
+        List[int]: The purchased product IDs.
     """
-    user = User.query.get(user_id)
-    if not user:
-        current_app.logger.error(f"User with ID {user_id} not found.")
-        return {"error": "User not found"}
+    purchased_products = [
+        product_id for product_id, in db.session.query(UserPurchase.product_id)
+        .filter_by(user_id=user_id).order_by(UserPurchase.product_id)
+    ]
+    current_app.logger.info("Fetched purchased products for user %s.", user_id)
+    return purchased_products
 
-    purchased_products = [int(p) for p in user.purchased_products.split(',')] if user.purchased_products else []
-    purchased_products.extend(product_ids)
-    purchased_products = list(set(purchased_products))
 
-    user.purchased_products = ','.join(map(str, purchased_products))
-    db.session.commit()
-    current_app.logger.info(f"Added products {product_ids} to user {user_id}'s purchased products.")
-    return {"message": "Products purchased successfully"}
+def _product_id_list(model, user_id: int) -> str:
+    product_ids = db.session.query(model.product_id).filter_by(user_id=user_id).order_by(model.product_id)
+    return ",".join(str(product_id) for product_id, in product_ids)
 
 
-def get_user_purchased_products(user_id: int) -> List[Dict]:
+def migrate_legacy_product_lists(connection) -> dict:
     """
-    Retrieves the user's list of purchased products from the database.
+    Moves the legacy comma-separated fav_products and purchased_products values into
+    the user_favorites and user_purchases tables, then empties the legacy columns.
+
+    Uses only Core statements on the given connection, so it can run from the CLI or
+    from an Alembic migration's upgrade() via `op.get_bind()`. IDs of products that no
+    longer exist are dropped. Safe to run more than once.
+
     Args:
-        user_id (str): The ID of the user.
+        connection (Connection): The database connection to run on.
+
     Returns:
-        List[Dict]: A list of dictionaries representing purchased products.
+        dict: The number of favorite and purchase rows inserted.
     """
-    user = User.query.get(user_id)
-    if user:
-        purchased_products = [int(p) for p in user.purchased_products.split(',')] if user.purchased_products else []
-        current_app.logger.info(f"Fetched purchased products for user {user_id}.")
-        return purchased_products
-    current_app.logger.warning(f"No purchased products found for user {user_id}.")
-    return []
+    users = connection.execute(
+        select(User.id, User.fav_products, User.purchased_products)
+        .where(or_(User.fav_products != "", User.purchased_products != ""))
+    ).all()
+    existing_products = set(connection.execute(select(Product.id)).scalars())
+
+    def rows(column):
+        return [
+            {"user_id": user.id, "product_id": int(product_id)}
+            for user in users
+            for product_id in set(filter(None, (getattr(user, column) or "").split(",")))
+            if int(product_id) in existing_products
+        ]
+
+    dialect_name = connection.dialect.name
+    inserted = {}
+    for key, model, column in (("favorites", UserFavorite, "fav_products"),
+                               ("purchases", UserPurchase, "purchased_products")):
+        values = rows(column)
+        if values:
+            connection.execute(upsert_insert(model, dialect_name).on_conflict_do_nothing(), values)
+        inserted[key] = len(values)
+
+    if users:
+        connection.execute(
+            update(User).where(User.id.in_([user.id for user in users]))
+            .values(fav_products="", purchased_products="")
+        )
+    return inserted
 
 
-def clear_user_basket(user_id: int):
+def allowed_file(filename):
+    """
+    Check if the file has one of the allowed extensions.
     """
-    Clears the user's basket after a successful purchase.
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-    Args:
-        user_id (int): The ID of the user.
+
+def avatar_variant_name(avatar: str, size: int) -> str:
     """
-    current_app.logger.info(f"Attempting to clear basket for user {user_id}.")
+    Returns the file name of one size of a content-addressed avatar.
 
-    basket_items = BasketItem.query.filter_by(user_id=user_id).all()
+    Args:
+        avatar (str): The avatar name stored on the user, e.g. '<digest>.webp'.
+        size (int): The edge length of the variant, in pixels.
+    """
+    digest, extension = avatar.rsplit('.', 1)
+    return f"{digest}-{size}.{extension}"
 
-    if not basket_items:
-        current_app.logger.info(f"No items found in the basket for user {user_id}.")
-        return {"message": "Basket is already empty"}
 
-    try:
-        for item in basket_items:
-            current_app.logger.info(f"Removing item {item.product_id} from basket for user {user_id}.")
-            db.session.delete(item)
+def is_content_addressed_avatar(filename: str) -> bool:
+    """
+    Check if an avatar name refers to processed, content-addressed variants rather
+    than a legacy upload stored as-is.
+    """
+    return bool(CONTENT_ADDRESSED_AVATAR.fullmatch(filename))
 
-        db.session.commit()
-        current_app.logger.info(f"Successfully cleared basket for user {user_id}.")
-        return {"message": "Basket cleared successfully"}
 
+def _remove_avatar_files(avatar: str):
+    # Identical uploads share content-addressed files, and another request may be
+    # pointing a user at them right now, so they are left for `flask prune-avatars`.
+    if is_content_addressed_avatar(avatar):
+        return
+    try:
+        avatar_storage.delete(avatar)
     except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Error clearing basket for user {user_id}: {e}")
-        return {"error": "Failed to clear basket"}
+        current_app.logger.error("Error deleting old avatar file %s: %s", avatar, e)
 
 
-def allowed_file(filename):
+def prune_unused_avatars(dry_run: bool = False) -> List[str]:
     """
-    Check if the file has one of the allowed extensions.
+    Deletes the stored variants of content-addressed avatars that no user references.
+
+    Uploads reuse the stored files of an identical image without re-encoding it, so an
+    upload of an image whose files are being pruned can end up without files. Run it
+    from a maintenance job at a quiet time; references are checked again right before
+    each avatar's files are deleted to keep that window short.
+
+    Args:
+        dry_run (bool): If True, only report what would be deleted.
+
+    Returns:
+        List[str]: The names of the deleted (or, in a dry run, deletable) files.
     """
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    variants = {}
+    for name in avatar_storage.list():
+        match = CONTENT_ADDRESSED_VARIANT.fullmatch(name)
+        if match:
+            variants.setdefault(f"{match.group(1)}.{match.group(2)}", []).append(name)
+    referenced = {avatar for avatar, in db.session.query(User.avatar).filter(User.avatar.in_(list(variants)))}
+
+    deleted = []
+    for avatar, names in sorted(variants.items()):
+        if avatar in referenced:
+            continue
+        if not dry_run:
+            if db.session.query(User.id).filter_by(avatar=avatar).first():
+                continue
+            for name in names:
+                avatar_storage.delete(name)
+        deleted.extend(sorted(names))
+    current_app.logger.info("Pruned %s unused avatar files%s.", len(deleted), " (dry run)" if dry_run else "")
+    return deleted
 
 
 def save_avatar(user_id, file):
     """
-    Save the user's avatar in the images folder, update the user's avatar in the database,
-    and only after a successful upload, delete the old avatar if it exists and is not 'user_default.png'.
+    Process the user's avatar and point the user at it. The upload is streamed to a
+    temporary file under the AVATAR_MAX_UPLOAD_BYTES cap, decoded and re-encoded into the
+    configured AVATAR_SIZES, and saved to the avatar storage backend under names derived
+    from the upload's content hash.
+    Uploading an image that is already stored reuses its files without re-encoding.
+    Only after the user is updated, a legacy old avatar is deleted unless it is
+    'user_default.png'. Content-addressed files may be shared with other users and are
+    removed by `flask prune-avatars` instead.
 
     Args:
         user_id (int): The ID of the user.
@@ -335,33 +468,51 @@ def save_avatar(user_id, file):
 
     user = User.query.get(user_id)
     if not user:
-        current_app.logger.error(f"User with ID {user_id} not found.")
+        current_app.logger.error("User with ID %s not found.", user_id)
         return {"error": "User not found"}
 
-    filename = secure_filename(f"user_{user_id}_{file.filename}")
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    config = current_app.config
+    extension = config['AVATAR_FORMAT'].lower()
     old_avatar = user.avatar
+    upload_fd, upload_path = tempfile.mkstemp(prefix="avatar-upload-")
+    os.close(upload_fd)
 
     try:
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-        file.save(filepath)
-        current_app.logger.info(f"File saved successfully at {filepath} for user {user_id}.")
+        digest = stream_to_file(file.stream, upload_path, config['AVATAR_MAX_UPLOAD_BYTES'])
+        avatar = f"{digest[:32]}.{extension}"
+        missing = [size for size in config['AVATAR_SIZES']
+                   if not avatar_storage.exists(avatar_variant_name(avatar, size))]
+        if missing:
+            variants = render_square_variants(upload_path, missing, image_format=config['AVATAR_FORMAT'],
+                                              quality=config['AVATAR_QUALITY'],
+                                              max_pixels=config['AVATAR_MAX_PIXELS'])
+            for size, data in variants.items():
+                avatar_storage.save(avatar_variant_name(avatar, size), data, immutable=True)
+            current_app.logger.info("Stored %s avatar variants of %s for user %s.", len(variants), avatar, user_id)
+        else:
+            current_app.logger.info("Reusing stored avatar %s for user %s.", avatar, user_id)
+    except UploadTooLarge:
+        return {"error": "File is too large"}
+    except InvalidImage as e:
+        return {"error": str(e)}
+    except Exception as e:
+        current_app.logger.error("Error saving avatar for user %s: %s", user_id, e)
+        return {"error": "Failed to upload avatar"}
+    finally:
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
 
-        user.avatar = filename
+    try:
+        user.avatar = avatar
         db.session.commit()
-        current_app.logger.info(f"User {user_id}'s avatar updated to {filename}.")
-
-        if old_avatar and old_avatar != 'user_default.png':
-            old_avatar_path = os.path.join(UPLOAD_FOLDER, old_avatar)
-            if os.path.exists(old_avatar_path):
-                try:
-                    os.remove(old_avatar_path)
-                    current_app.logger.info(f"Deleted old avatar {old_avatar} for user {user_id}.")
-                except Exception as e:
-                    current_app.logger.error(f"Error deleting old avatar {old_avatar}: {e}")
-
-        return {"message": "Avatar uploaded successfully", "avatar_url": filepath}
     except Exception as e:
-        current_app.logger.error(f"Error saving avatar for user {user_id}: {e}")
+        db.session.rollback()
+        current_app.logger.error("Error saving avatar for user %s: %s", user_id, e)
         return {"error": "Failed to upload avatar"}
+    invalidate_user_profile(user_id)
+    current_app.logger.info("User %s's avatar updated to %s.", user_id, avatar)
+
+    if old_avatar and old_avatar not in (avatar, 'user_default.png'):
+        _remove_avatar_files(old_avatar)
+
+    return {"message": "Avatar uploaded successfully", "avatar": avatar, "avatar_url": f"/api/me/avatar/{avatar}"}
@@ -0,0 +1,446 @@
+"""
+HTTP load generator and benchmark suite for the API.
+
+Run from the backend directory:
+
+    python -m app.testing.load_test --users 8 --duration 30
+    python -m app.testing.load_test --database-uri postgresql://localhost/grocery --users 16
+    python -m app.testing.load_test --url http://localhost:5000 --users 32 --duration 60
+
+Without --url, the app is created with create_app and served by a threaded server
+in this process. With a SQLite database (the default is app/local.db), a temporary
+copy is used so the run leaves the original untouched; Postgres databases are used
+as-is. Each virtual user registers and logs in once, then loops over a weighted mix
+of realistic actions: browsing and searching the catalog, reading its profile and
+basket, syncing the basket, purchasing, favorites, logging in again and health
+checks.
+
+The report lists throughput, error count and p50/p95/p99 latency per endpoint.
+--save-baseline stores it as JSON; --baseline compares a run against a stored report
+and exits with status 1 if an endpoint's p95 latency grew by more than --tolerance.
+
+--replay FILE sends the requests recorded in a JSONL file instead of the mix, one
+object per line with "method" and "path" and optionally "json", "headers",
+"auth" (send a logged-in user's token) and "delay_ms" (pause before sending).
+Lines without a method and path are skipped.
+"""
+import argparse
+import gzip
+import http.client
+import json
+import math
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from ..middleware.compression import brotli
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(fraction * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """
+    Collects latency samples and errors per endpoint label from all virtual users.
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, label: str, seconds: float, ok: bool):
+        with self._lock:
+            self.samples[label].append(seconds * 1000)
+            if not ok:
+                self.errors[label] += 1
+
+    def reset(self):
+        """
+        Drops everything recorded so far, e.g. the requests made while setting up.
+        """
+        with self._lock:
+            self.samples.clear()
+            self.errors.clear()
+
+    def report(self, elapsed: float) -> Dict[str, dict]:
+        report = {}
+        for label, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            report[label] = {
+                "requests": len(ordered),
+                "errors": self.errors[label],
+                "rps": len(ordered) / elapsed,
+                "p50_ms": percentile(ordered, 0.50),
+                "p95_ms": percentile(ordered, 0.95),
+                "p99_ms": percentile(ordered, 0.99),
+            }
+        total = sum(len(samples) for samples in self.samples.values())
+        report["TOTAL"] = {
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "rps": total / elapsed,
+            **{key: percentile(sorted(s for samples in self.samples.values() for s in samples), fraction)
+               for key, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99))},
+        }
+        return report
+
+
+class Client:
+    """
+    Minimal keep-alive HTTP client, one per virtual user.
+    """
+
+    def __init__(self, base_url: str, recorder: Recorder):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.recorder = recorder
+        self.token = None
+        self._connection = None
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self._connection = connection_class(self.host, self.port, timeout=30)
+
+    def request(self, label: str, method: str, path: str, body=None, auth: bool = False,
+                headers: Optional[Dict[str, str]] = None):
+        """
+        Sends one request and records its latency under the given label.
+
+        Returns:
+            tuple: The status code and the decoded JSON body (None if not JSON).
+        """
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", "gzip, br" if brotli is not None else "gzip")
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        if auth and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        start = time.perf_counter()
+        for attempt in (1, 2):
+            if self._connection is None:
+                self._connect()
+            try:
+                self._connection.request(method, path, body=data, headers=headers)
+                response = self._connection.getresponse()
+                payload = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                self._connection.close()
+                self._connection = None
+                if attempt == 2:
+                    self.recorder.record(label, time.perf_counter() - start, ok=False)
+                    return 0, None
+        self.recorder.record(label, time.perf_counter() - start, ok=response.status < 400)
+
+        parsed = None
+        if (response.getheader("Content-Type") or "").startswith("application/json"):
+            coding = response.getheader("Content-Encoding")
+            if coding == "gzip":
+                payload = gzip.decompress(payload)
+            elif coding == "br":
+                payload = brotli.decompress(payload)
+            parsed = json.loads(payload or b"null")
+        return response.status, parsed
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+
+
+class VirtualUser:
+    """
+    A shopper that registers once and then performs a weighted mix of actions.
+    """
+
+    PASSWORD = "load-test-password"
+
+    def __init__(self, client: Client, product_ids: List[int], rng: random.Random):
+        self.client = client
+        self.product_ids = product_ids
+        self.rng = rng
+        self.email = f"loadtest_{uuid.uuid4().hex[:12]}@example.com"
+        self.actions = [
+            (self.browse_catalog, 25),
+            (self.browse_page, 15),
+            (self.view_product, 20),
+            (self.search, 10),
+            (self.view_profile, 8),
+            (self.sync_basket, 10),
+            (self.view_basket, 5),
+            (self.toggle_favorite, 4),
+            (self.purchase, 3),
+            (self.login, 2),
+            (self.health, 1),
+        ]
+
+    def setup(self):
+        self.client.request("register", "POST", "/api/auth/register",
+                            {"username": self.email.split("@")[0], "email": self.email, "password": self.PASSWORD})
+        self.login()
+
+    def step(self):
+        actions, weights = zip(*self.actions)
+        self.rng.choices(actions, weights)[0]()
+
+    def login(self):
+        status, body = self.client.request("login", "POST", "/api/auth/login",
+                                           {"email": self.email, "password": self.PASSWORD})
+        if status == 200 and body:
+            self.client.token = body["access_token"]
+
+    def browse_catalog(self):
+        self.client.request("products.all", "GET", "/api/products/all_products")
+
+    def browse_page(self):
+        sort = self.rng.choice(["price", "name", "rating"])
+        self.client.request("products.page", "GET", f"/api/products/all_products?limit=24&sort={sort}&lean=true")
+
+    def view_product(self):
+        self.client.request("products.one", "GET", f"/api/products/{self.rng.choice(self.product_ids)}")
+
+    def search(self):
+        term = self.rng.choice(["milk", "apple", "bread", "cheese", "wine", "chicken", "juice"])
+        self.client.request("products.search", "GET", f"/api/products/search?q={term}")
+
+    def view_profile(self):
+        self.client.request("me.info", "GET", "/api/me/info", auth=True)
+
+    def view_basket(self):
+        self.client.request("me.basket", "GET", "/api/me/basket", auth=True)
+
+    def sync_basket(self):
+        items = self.rng.sample(self.product_ids, k=min(len(self.product_ids), self.rng.randint(1, 8)))
+        basket = [{"product_id": product_id, "quantity": self.rng.randint(1, 3)} for product_id in items]
+        self.client.request("me.basket.sync", "POST", "/api/me/basket", basket, auth=True)
+
+    def toggle_favorite(self):
+        product_id = self.rng.choice(self.product_ids)
+        self.client.request("me.favorites.add", "POST", "/api/me/favorites", {"product_id": product_id}, auth=True)
+
+    def purchase(self):
+        items = self.rng.sample(self.product_ids, k=min(len(self.product_ids), self.rng.randint(1, 4)))
+        self.client.request("me.purchase", "POST", "/api/me/purchase", {"purchased_products": items}, auth=True)
+
+    def health(self):
+        self.client.request("health", "GET", "/health")
+
+
+def run_mix(base_url: str, users: int, duration: float, seed: int) -> dict:
+    """
+    Drives the weighted action mix with concurrent virtual users for a fixed time.
+
+    Returns:
+        dict: The per-endpoint report.
+    """
+    setup_recorder = Recorder()
+    _, products = Client(base_url, setup_recorder).request(
+        "setup", "GET", "/api/products/all_products?lean=true")
+    product_ids = [product["id"] for product in products or []]
+    if not product_ids:
+        raise SystemExit("The database has no products; seed it first.")
+
+    recorder = Recorder()
+    virtual_users = [VirtualUser(Client(base_url, recorder), product_ids, random.Random(seed + i))
+                     for i in range(users)]
+    for user in virtual_users:
+        user.setup()
+    recorder.reset()
+
+    deadline = time.monotonic() + duration
+
+    def loop(user: VirtualUser):
+        while time.monotonic() < deadline:
+            user.step()
+        user.client.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=loop, args=(user,), daemon=True) for user in virtual_users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.report(time.perf_counter() - start)
+
+
+def load_replay(path: str) -> List[dict]:
+    entries = []
+    with open(path) as source:
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, dict) and entry.get("method") and entry.get("path"):
+                entries.append(entry)
+    return entries
+
+
+def replay_label(method: str, path: str) -> str:
+    """
+    Groups replayed requests by method and path, with numeric IDs collapsed.
+    """
+    return f"{method.upper()} {_ID_SEGMENT.sub('/{id}', path.split('?')[0])}"
+
+
+def run_replay(base_url: str, entries: List[dict], users: int) -> dict:
+    """
+    Replays recorded requests, spread round-robin over concurrent clients. Requests
+    marked "auth" are sent with the token of a freshly registered user.
+
+    Returns:
+        dict: The per-endpoint report.
+    """
+    recorder = Recorder()
+    clients = [Client(base_url, recorder) for _ in range(users)]
+    if any(entry.get("auth") for entry in entries):
+        for i, client in enumerate(clients):
+            VirtualUser(client, [], random.Random(i)).setup()
+    recorder.reset()
+
+    def loop(client: Client, batch: List[dict]):
+        for entry in batch:
+            if entry.get("delay_ms"):
+                time.sleep(entry["delay_ms"] / 1000)
+            label = entry.get("label") or replay_label(entry["method"], entry["path"])
+            client.request(label, entry["method"].upper(), entry["path"], entry.get("json"),
+                           auth=bool(entry.get("auth")), headers=entry.get("headers"))
+        client.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=loop, args=(client, entries[i::users]), daemon=True)
+               for i, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.report(time.perf_counter() - start)
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float, min_requests: int = 20) -> List[str]:
+    """
+    Lists the endpoints whose p95 latency regressed beyond the tolerance. Endpoints
+    with fewer than min_requests samples in either run are too noisy to judge.
+    """
+    regressions = []
+    for label, current in report.items():
+        previous = baseline.get(label)
+        if not previous or min(previous["requests"], current["requests"]) < min_requests:
+            continue
+        if previous["p95_ms"] > 0 and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {previous['p95_ms']:.1f} ms -> {current['p95_ms']:.1f} ms")
+    return regressions
+
+
+def print_report(report: dict, baseline: Optional[dict] = None):
+    print(f"{'endpoint':<24} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+          + ("  p95 vs baseline" if baseline else ""))
+    for label, row in report.items():
+        line = (f"{label:<24} {row['requests']:>7} {row['errors']:>5} {row['rps']:>8.1f} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+        if baseline and label in baseline and baseline[label]["p95_ms"]:
+            line += f"  {(row['p95_ms'] / baseline[label]['p95_ms'] - 1) * 100:+.0f}%"
+        print(line)
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def start_local_server(database_uri: Optional[str]):
+    """
+    Creates the app against a database and serves it from a background thread.
+
+    Returns:
+        tuple: The base URL, the server and the temporary directory to clean up.
+    """
+    from .. import Config, create_app
+
+    database_uri = database_uri or Config.SQLALCHEMY_DATABASE_URI
+    temp_dir = None
+    if database_uri and database_uri.startswith("sqlite:///"):
+        temp_dir = tempfile.mkdtemp(prefix="load-test-")
+        copy = os.path.join(temp_dir, "load_test.db")
+        shutil.copy(database_uri[len("sqlite:///"):], copy)
+        database_uri = f"sqlite:///{copy}"
+    Config.SQLALCHEMY_DATABASE_URI = database_uri
+
+    app = create_app()
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server, temp_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API with a mixed workload or a replay.")
+    parser.add_argument("--url", help="Base URL of a running server; by default the app is served in-process.")
+    parser.add_argument("--database-uri", help="Database for the in-process app; defaults to the configured one.")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent virtual users.")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to run the mix for.")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the action mix.")
+    parser.add_argument("--replay", help="JSONL file of recorded requests to replay instead of the mix.")
+    parser.add_argument("--baseline", help="Report JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 growth over the baseline.")
+    parser.add_argument("--min-requests", type=int, default=20,
+                        help="Endpoints with fewer samples are not compared against the baseline.")
+    parser.add_argument("--save-baseline", help="Write this run's report to a JSON file.")
+    args = parser.parse_args()
+
+    server = temp_dir = None
+    base_url = args.url
+    if base_url is None:
+        base_url, server, temp_dir = start_local_server(args.database_uri)
+    try:
+        if args.replay:
+            report = run_replay(base_url, load_replay(args.replay), args.users)
+        else:
+            report = run_mix(base_url, args.users, args.duration, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as source:
+            baseline = json.load(source)
+    print_report(report, baseline)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    if baseline:
+        regressions = compare_to_baseline(report, baseline, args.tolerance, args.min_requests)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark of login throughput at several password hashing pool sizes.
+
+Run from the backend directory:
+
+    python -m app.testing.login_benchmark --pool-sizes 0 1 2 4 --clients 16 --logins 64
+
+For each pool size it hashes one password with the configured method, then has
+`--clients` threads verify it `--logins` times in total, the way concurrent login
+requests would. It reports verified logins per second, the mean and worst latency,
+and how many logins were rejected because the pool was saturated or timed out.
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .. import create_app
+from ..utils.passwords import PasswordHasher, PasswordPoolSaturated, PasswordPoolTimeout
+
+
+def benchmark_pool_size(config, pool_size: int, clients: int, logins: int) -> dict:
+    """
+    Measures verification throughput of one pool size under concurrent clients.
+
+    Returns:
+        dict: Throughput in logins per second, latencies in milliseconds and the
+        number of rejected logins.
+    """
+    hasher = PasswordHasher()
+    hasher.configure(
+        method=config["PASSWORD_HASH_METHOD"],
+        pool_size=pool_size,
+        max_queue=config["PASSWORD_POOL_MAX_QUEUE"],
+        timeout=config["PASSWORD_POOL_TIMEOUT"],
+        start_method=config["PASSWORD_POOL_START_METHOD"],
+    )
+    pwhash = hasher.hash("benchmark-password")
+    latencies = []
+    rejected = 0
+    lock = threading.Lock()
+
+    def login(_):
+        nonlocal rejected
+        start = time.perf_counter()
+        try:
+            hasher.verify(pwhash, "benchmark-password")
+        except (PasswordPoolSaturated, PasswordPoolTimeout):
+            with lock:
+                rejected += 1
+            return
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(login, range(logins)))
+        elapsed = time.perf_counter() - start
+    finally:
+        hasher.shutdown()
+
+    return {
+        "pool_size": pool_size,
+        "logins_per_s": len(latencies) / elapsed,
+        "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "max_ms": max(latencies, default=0.0),
+        "rejected": rejected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login throughput per password pool size.")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[0, 1, 2, 4],
+                        help="Pool sizes to measure; 0 hashes inline in the request thread.")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent login threads.")
+    parser.add_argument("--logins", type=int, default=64, help="Total logins per pool size.")
+    args = parser.parse_args()
+
+    app = create_app()
+    print(f"method {app.config['PASSWORD_HASH_METHOD']}, max queue {app.config['PASSWORD_POOL_MAX_QUEUE']}, "
+          f"{args.clients} clients, {args.logins} logins")
+    for pool_size in args.pool_sizes:
+        result = benchmark_pool_size(app.config, pool_size, args.clients, args.logins)
+        print(f"pool {result['pool_size']:>2}: {result['logins_per_s']:7.1f} logins/s  "
+              f"mean {result['mean_ms']:7.1f} ms  max {result['max_ms']:7.1f} ms  "
+              f"rejected {result['rejected']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+SQL query counting, N+1 detection and per-endpoint query budgets.
+
+Use the helpers in tests:
+
+    with assert_max_queries(2):
+        client.get("/api/products/all_products")
+
+or check every declared endpoint budget against the configured database, e.g. in CI:
+
+    python -m app.testing.query_budget
+
+Every endpoint is requested with cold caches, so the count is what a cache miss
+costs. The command exits with status 1 if any endpoint exceeds its budget or runs
+the same query shape repeatedly (an N+1 pattern).
+"""
+import argparse
+import re
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))*\s*\)")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def query_shape(statement: str) -> str:
+    """
+    Normalizes a SQL statement so that queries differing only in their parameters,
+    literals or IN-list lengths have the same shape.
+    """
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block runs more queries than its budget, or an N+1 pattern."""
+
+
+class QueryCounter:
+    """
+    Context manager that records every SQL statement executed on the current thread.
+
+    Attributes:
+        statements (List[str]): The executed statements, in order.
+    """
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self._thread_id = None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread_id:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, "before_cursor_execute", self._before_cursor_execute)
+        return False
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated_shapes(self, threshold: int = 3) -> Dict[str, int]:
+        """
+        Returns the query shapes that ran at least `threshold` times, which usually
+        means a query is issued once per item of a list (N+1).
+        """
+        counts = Counter(query_shape(statement) for statement in self.statements)
+        return {shape: count for shape, count in counts.items() if count >= threshold}
+
+    def problems(self, max_queries: int, repeat_threshold: Optional[int] = 3) -> List[str]:
+        """
+        Describes how the recorded statements violate a query budget.
+
+        Returns:
+            List[str]: One message per problem; empty if the budget was kept.
+        """
+        problems = []
+        if self.count > max_queries:
+            problems.append(f"Expected at most {max_queries} queries, got {self.count}.")
+        if repeat_threshold is not None:
+            for shape, count in self.repeated_shapes(repeat_threshold).items():
+                problems.append(f"N+1 pattern: {count} queries with shape: {shape[:200]}")
+        return problems
+
+    def report(self) -> str:
+        return "\n".join(f"  {i + 1}. {_WHITESPACE.sub(' ', statement)[:200]}"
+                         for i, statement in enumerate(self.statements))
+
+
+class assert_max_queries(QueryCounter):
+    """
+    Fails if the block executes more than `max_queries` statements, or repeats the
+    same query shape `repeat_threshold` or more times.
+
+    Args:
+        max_queries (int): The query budget of the block.
+        repeat_threshold (int, optional): Minimum repetitions of one shape reported as
+            an N+1 pattern; None disables the check.
+    """
+
+    def __init__(self, max_queries: int, repeat_threshold: Optional[int] = 3):
+        super().__init__()
+        self.max_queries = max_queries
+        self.repeat_threshold = repeat_threshold
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+        problems = self.problems(self.max_queries, self.repeat_threshold)
+        if problems:
+            raise QueryBudgetExceeded("\n".join(problems + [self.report()]))
+        return False
+
+
+@dataclass
+class EndpointBudget:
+    name: str
+    method: str
+    path: str
+    max_queries: int
+    authenticated: bool = False
+    json: Optional[object] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+# Budgets for a cache miss on each endpoint. Authenticated endpoints include the
+# JWT user lookup.
+ENDPOINT_BUDGETS = [
+    EndpointBudget("all_products", "GET", "/api/products/all_products", 2),
+    EndpointBudget("all_products lean", "GET", "/api/products/all_products?lean=true", 1),
+    EndpointBudget("products page", "GET", "/api/products/all_products?limit=20&sort=price", 2),
+    EndpointBudget("single product", "GET", "/api/products/1", 2),
+    EndpointBudget("search", "GET", "/api/products/search?q=milk", 3),
+    EndpointBudget("favorites count", "GET", "/api/products/1/favorites-count", 1),
+    EndpointBudget("user info", "GET", "/api/me/info", 4, authenticated=True),
+    EndpointBudget("all users", "GET", "/api/me/all-users", 2, authenticated=True),
+    EndpointBudget("favorites", "GET", "/api/me/favorites", 3, authenticated=True),
+    EndpointBudget("basket", "GET", "/api/me/basket", 2, authenticated=True),
+    EndpointBudget("purchased products", "GET", "/api/me/purchased-products", 2, authenticated=True),
+    EndpointBudget("orders", "GET", "/api/me/orders", 3, authenticated=True),
+    EndpointBudget("sync basket", "POST", "/api/me/basket", 3, authenticated=True,
+                   json=[{"product_id": product_id, "quantity": 2} for product_id in range(1, 11)]),
+]
+
+
+def _clear_caches():
+    from .. import catalog_cache, search_cache, user_profile_cache
+
+    catalog_cache.clear()
+    search_cache.clear()
+    user_profile_cache.clear()
+
+
+def check_endpoint_budgets(app, budgets: List[EndpointBudget], user_id: int,
+                           repeat_threshold: Optional[int] = 3) -> List[dict]:
+    """
+    Requests each endpoint once with cold caches and checks it against its budget.
+
+    Write endpoints run inside the request's transaction as usual, so point the app
+    at a disposable copy of the database.
+
+    Returns:
+        List[dict]: For each budget, its name, the query count and any problems.
+    """
+    with app.app_context():
+        token = create_access_token(identity=str(user_id))
+    client = app.test_client()
+    results = []
+    for budget in budgets:
+        headers = dict(budget.headers)
+        if budget.authenticated:
+            headers["Authorization"] = f"Bearer {token}"
+        _clear_caches()
+        with QueryCounter() as counter:
+            response = client.open(budget.path, method=budget.method, json=budget.json, headers=headers)
+        problems = counter.problems(budget.max_queries, repeat_threshold)
+        if response.status_code >= 400:
+            problems.append(f"Unexpected status {response.status_code}.")
+        results.append({
+            "name": budget.name,
+            "queries": counter.count,
+            "budget": budget.max_queries,
+            "problems": problems,
+            "report": counter.report(),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check SQL query budgets of the API endpoints.")
+    parser.add_argument("--user-id", type=int, default=3, help="User to authenticate as.")
+    parser.add_argument("--repeat-threshold", type=int, default=3,
+                        help="Repetitions of one query shape reported as N+1.")
+    parser.add_argument("--verbose", action="store_true", help="Print the queries of every endpoint.")
+    args = parser.parse_args()
+
+    from .. import create_app
+
+    app = create_app()
+    results = check_endpoint_budgets(app, ENDPOINT_BUDGETS, args.user_id, args.repeat_threshold)
+    failed = False
+    for result in results:
+        status = "FAIL" if result["problems"] else "ok"
+        print(f"{status:4}  {result['name']:<20} {result['queries']:>3} / {result['budget']} queries")
+        for problem in result["problems"]:
+            print(f"      {problem}")
+        if result["problems"] or args.verbose:
+            print(result["report"])
+        failed = failed or bool(result["problems"])
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
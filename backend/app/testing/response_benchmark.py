@@ -0,0 +1,79 @@
+"""
+Benchmark of the response layer: JSON encoding and compression per response.
+
+Run from the backend directory against the configured database:
+
+    python -m app.testing.response_benchmark --repeat 50
+
+For each payload it reports the mean time to encode with the stdlib encoder and with
+the app's FastJSONProvider, then the size and time of gzip and brotli compression at
+the configured levels.
+"""
+import argparse
+import gzip
+import json
+import time
+
+from .. import create_app
+from ..middleware.compression import brotli
+from ..services.product_service import get_all_products
+from ..services.user_service import get_all_users
+
+
+def _mean_ms(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def benchmark_payload(app, name: str, payload, repeat: int) -> dict:
+    """
+    Measures encoding and compression costs for one response payload.
+
+    Returns:
+        dict: Timings in milliseconds and sizes in bytes.
+    """
+    config = app.config
+    body = app.json.dumps(payload).encode()
+    result = {
+        "payload": name,
+        "stdlib_ms": _mean_ms(lambda: json.dumps(payload, sort_keys=True), repeat),
+        "provider_ms": _mean_ms(lambda: app.json.dumps(payload), repeat),
+        "identity_bytes": len(body),
+        "gzip_bytes": len(gzip.compress(body, compresslevel=config["COMPRESS_GZIP_LEVEL"])),
+        "gzip_ms": _mean_ms(lambda: gzip.compress(body, compresslevel=config["COMPRESS_GZIP_LEVEL"]), repeat),
+    }
+    if brotli is not None:
+        quality = config["COMPRESS_BROTLI_QUALITY"]
+        result["br_bytes"] = len(brotli.compress(body, quality=quality))
+        result["br_ms"] = _mean_ms(lambda: brotli.compress(body, quality=quality), repeat)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding and compression per response.")
+    parser.add_argument("--repeat", type=int, default=20, help="Iterations per measurement.")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        payloads = {
+            "all_products": get_all_products(),
+            "all_products?lean=true": get_all_products(lean=True),
+            "all-users": get_all_users(),
+        }
+        for name, payload in payloads.items():
+            result = benchmark_payload(app, name, payload, args.repeat)
+            print(f"{result['payload']}:")
+            print(f"  encode  stdlib {result['stdlib_ms']:.2f} ms  provider {result['provider_ms']:.2f} ms "
+                  f"({result['stdlib_ms'] / max(result['provider_ms'], 1e-9):.1f}x)")
+            print(f"  gzip    {result['identity_bytes']} -> {result['gzip_bytes']} bytes "
+                  f"in {result['gzip_ms']:.2f} ms")
+            if "br_bytes" in result:
+                print(f"  brotli  {result['identity_bytes']} -> {result['br_bytes']} bytes "
+                      f"in {result['br_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Any, Callable, Hashable, Optional
+
+CacheInfo = namedtuple("CacheInfo", ["etag", "created_at"])
+
+
+class _Build:
+    """
+    A build of one key in progress, which concurrent callers of that key wait for.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.failed = False
+        self.value = None
+
+
+def json_fingerprint(value: Any) -> str:
+    """
+    Returns a stable content hash of a JSON-serializable value.
+    """
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return hashlib.sha1(raw).hexdigest()[:20]
+
+
+class VersionedCache:
+    """
+    Bounded, in-process TTL cache with a global version counter.
+
+    Every entry is stamped with the version that was current when it was built.
+    Calling invalidate() bumps the version, which makes every existing entry stale at
+    once, and a value whose build started before an invalidation is never stored.
+    Only one caller rebuilds a missing or expired key; concurrent callers for the
+    same key wait for that build instead of stampeding the database.
+
+    Values are returned as stored, not copied, and are shared by every caller and
+    thread. Callers must treat them as read-only.
+
+    The cache lives in the memory of a single worker process, so writes in one
+    gunicorn worker only invalidate that worker. The TTL bounds how long other
+    workers can serve the previous state.
+
+    If a fingerprint function is given, every stored value also gets a CacheInfo with
+    its content hash and build time, usable as an HTTP validator. Because the hash is
+    derived from content, it is the same in every worker that holds the same data.
+
+    If a store_guard is set, it is called with the cache before each value is stored
+    and the value is only returned, not stored, when it returns False.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60.0,
+                 fingerprint: Optional[Callable[[Any], str]] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.fingerprint = fingerprint
+        self.version = 0
+        self.invalidated_at = float("-inf")
+        self.store_guard: Optional[Callable[["VersionedCache"], bool]] = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._builds = {}
+
+    def init_app(self, app, prefix: str):
+        """
+        Reads the size and TTL for this cache from the app config.
+
+        Args:
+            app (Flask): The Flask application.
+            prefix (str): Config key prefix, e.g. 'CATALOG_CACHE'.
+        """
+        self.max_entries = app.config.get(f"{prefix}_MAX_ENTRIES", self.max_entries)
+        self.ttl = app.config.get(f"{prefix}_TTL", self.ttl)
+        self.clear()
+
+    def _lookup(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        version, expires_at, value, info = entry
+        if version != self.version or expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the cached value for a key, or the default if it is missing or stale.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+        return entry[2] if entry else default
+
+    def peek_info(self, key: Hashable) -> Optional[CacheInfo]:
+        """
+        Returns the CacheInfo of a fresh cached value without building anything.
+
+        Returns:
+            CacheInfo: The entry's fingerprint and build time, or None if the key is
+                missing, stale or the cache has no fingerprint function.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+        return entry[3] if entry else None
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None):
+        """
+        Stores a value, evicting the least recently used entry when the cache is full.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to store.
+            version (int, optional): The version the value was built from. The value
+                is dropped if the cache has been invalidated since.
+        """
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        if self.store_guard is not None and not self.store_guard(self):
+            return
+        info = CacheInfo(self.fingerprint(value), time.time()) if self.fingerprint else None
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (self.version, time.monotonic() + self.ttl, value, info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, builder: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for a key, building and storing it on a miss.
+
+        Only one thread builds a given key at a time; the others block until the
+        build finishes and return its result. Exceptions raised by the builder
+        propagate and nothing is cached; the waiting threads then try again, one of
+        them building. The returned value must not be modified.
+
+        Args:
+            key (Hashable): The cache key.
+            builder (Callable[[], Any]): Function that produces the value.
+
+        Returns:
+            Any: The cached or freshly built value.
+        """
+        while True:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry:
+                    return entry[2]
+                build = self._builds.get(key)
+                if build is None:
+                    build = self._builds[key] = _Build()
+                    version = self.version
+                    break
+            build.done.wait()
+            if not build.failed:
+                return build.value
+
+        try:
+            build.value = builder()
+            self.set(key, build.value, version=version)
+            return build.value
+        except BaseException:
+            build.failed = True
+            raise
+        finally:
+            # Unregister before waking the waiters, so a failed build's waiters start
+            # a new one instead of waiting for this one again.
+            with self._lock:
+                self._builds.pop(key, None)
+            build.done.set()
+
+    def delete(self, key: Hashable):
+        """
+        Removes a single key from the cache.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self):
+        """
+        Bumps the cache version, making every cached entry stale.
+        """
+        with self._lock:
+            self.version += 1
+            self.invalidated_at = time.monotonic()
+            self._entries.clear()
+
+    def clear(self):
+        """
+        Drops every cached entry without changing the version.
+        """
+        with self._lock:
+            self._entries.clear()
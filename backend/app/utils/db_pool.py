@@ -0,0 +1,180 @@
+import logging
+import time
+
+from flask import jsonify
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from ..middleware.metrics import InstrumentedQueuePool
+
+logger = logging.getLogger(__name__)
+
+
+def engine_options(uri: str, config) -> dict:
+    """
+    Returns the engine options for a database URI.
+
+    Database servers get an InstrumentedQueuePool, which measures checkout waits for
+    metrics and /health/pool, sized by the DB_POOL_* settings. SQLite keeps the
+    default pools of SQLAlchemy and Flask-SQLAlchemy: a QueuePool for a file and a
+    StaticPool, which takes no sizing options, for an in-memory database.
+
+    Args:
+        uri (str): The database URI.
+        config (Mapping): The app config.
+    """
+    if not uri or make_url(uri).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+
+def _set_statement_timeout(timeout_ms: int):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"SET statement_timeout = {int(timeout_ms)}")
+        finally:
+            cursor.close()
+        # Outside autocommit psycopg2 opened a transaction for the SET; commit it so
+        # the setting outlives it and the connection enters the pool idle.
+        dbapi_connection.commit()
+    return on_connect
+
+
+def _sqlite_pragmas(config) -> list:
+    return [
+        ("journal_mode", config["SQLITE_JOURNAL_MODE"]),
+        ("synchronous", config["SQLITE_SYNCHRONOUS"]),
+        ("mmap_size", int(config["SQLITE_MMAP_SIZE"])),
+        ("cache_size", int(config["SQLITE_CACHE_SIZE"])),
+        ("busy_timeout", int(config["SQLITE_BUSY_TIMEOUT_MS"])),
+        ("foreign_keys", "ON"),
+    ]
+
+
+def _apply_sqlite_pragmas(pragmas: list):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def _is_locked(error: Exception) -> bool:
+    return "database is locked" in str(error) or "database table is locked" in str(error)
+
+
+def _retry_when_locked(retries: int, delay: float, method: str):
+    """
+    Returns a do_execute* event handler that runs the DBAPI cursor `method` and
+    retries it with exponential backoff while it fails with "database is locked"
+    even after busy_timeout.
+
+    Only statements issued outside a transaction are retried. pysqlite begins its
+    transaction right before the first write, so such a statement holds no locks
+    and nothing before it is lost. Inside a transaction, the locks and writes taken
+    so far make retrying the statement alone unsafe, so the error is raised and the
+    transaction is rolled back as usual.
+    """
+    def handler(cursor, statement, *args):
+        # args is (parameters, context), or just (context,) for do_execute_no_params.
+        retry = not cursor.connection.in_transaction
+        for attempt in range(retries + 1):
+            try:
+                getattr(cursor, method)(statement, *args[:-1])
+                return True
+            except Exception as e:
+                if not retry or attempt == retries or not _is_locked(e):
+                    raise
+                logger.warning("SQLite database is locked; retrying (%s/%s).", attempt + 1, retries)
+                time.sleep(delay * 2 ** attempt)
+    return handler
+
+
+def configure_engine(engine, config):
+    """
+    Applies per-connection settings to every new connection of an engine.
+
+    On Postgres, DB_STATEMENT_TIMEOUT_MS becomes the session's statement_timeout, so
+    a runaway query is cancelled by the server instead of holding its connection.
+
+    On SQLite, every connection gets the SQLITE_* pragmas: WAL so readers do not block
+    behind the writer, synchronous=NORMAL (durable at checkpoints, safe with WAL),
+    memory mapping, the page cache size, busy_timeout, and foreign key enforcement,
+    which SQLite otherwise disables per connection. Statements outside a transaction
+    that still fail with "database is locked" are retried SQLITE_LOCKED_RETRIES times.
+
+    Args:
+        engine (Engine): The engine to configure, before it has connected.
+        config (Mapping): The app config.
+    """
+    dialect_name = engine.dialect.name
+    if dialect_name == "postgresql" and config["DB_STATEMENT_TIMEOUT_MS"]:
+        event.listen(engine, "connect", _set_statement_timeout(config["DB_STATEMENT_TIMEOUT_MS"]))
+    elif dialect_name == "sqlite":
+        event.listen(engine, "connect", _apply_sqlite_pragmas(_sqlite_pragmas(config)))
+        retries, delay = config["SQLITE_LOCKED_RETRIES"], config["SQLITE_LOCKED_RETRY_DELAY"]
+        if retries:
+            for name, method in (("do_execute", "execute"), ("do_execute_no_params", "execute"),
+                                 ("do_executemany", "executemany")):
+                event.listen(engine, name, _retry_when_locked(retries, delay, method))
+
+
+def pool_status(engine) -> dict:
+    """
+    Describes the state of an engine's connection pool.
+
+    Returns:
+        dict: The pool settings and its checked-out, idle and overflow connections.
+            Pools other than QueuePool only report their class.
+    """
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if not isinstance(pool, QueuePool):
+        return status
+    capacity = pool.size() + pool._max_overflow
+    checked_out = pool.checkedout()
+    status.update({
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+        "recycle": pool._recycle,
+        "pre_ping": pool._pre_ping,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "saturation": round(checked_out / capacity, 3) if capacity > 0 else 0.0,
+    })
+    return status
+
+
+def init_db_pool(app, engines):
+    """
+    Configures the connections of the given engines and answers requests that time
+    out waiting for a pooled connection with a 503 instead of a 500.
+
+    Must run before the engines open their first connection.
+
+    Args:
+        app (Flask): The Flask application.
+        engines (list): The primary engine and any replica engines.
+    """
+    for engine in engines:
+        configure_engine(engine, app.config)
+
+    @app.errorhandler(exc.TimeoutError)
+    def _pool_timeout(error):
+        response = jsonify({'error': 'Server is busy, please try again shortly'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
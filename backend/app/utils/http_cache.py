@@ -0,0 +1,69 @@
+from typing import Hashable, Optional
+from flask import current_app, request
+
+from .cache import CacheInfo, VersionedCache
+from ..middleware.compression import ENCODINGS
+
+
+def _cache_control(max_age: int) -> str:
+    return f"public, max-age={max_age}, must-revalidate"
+
+
+def _matching_validator(info: CacheInfo) -> Optional[str]:
+    """
+    Returns the ETag the client's validators matched, or None if the response changed.
+
+    A client may hold the identity or any compressed representation of the value.
+    If-Modified-Since is ignored: entries are built per worker, so their build times
+    differ between workers and say nothing about when the data changed.
+    """
+    if request.if_none_match:
+        etags = [info.etag] + [f"{info.etag}-{coding}" for coding in ENCODINGS]
+        return next((etag for etag in etags if request.if_none_match.contains(etag)), None)
+    return None
+
+
+def not_modified_response(cache: VersionedCache, key: Hashable):
+    """
+    Builds a 304 response if the client's validators match the cached value for a key.
+
+    This only looks at the in-memory cache, so a matching conditional request is
+    answered without touching the database or serializing anything.
+
+    Args:
+        cache (VersionedCache): The cache holding the value.
+        key (Hashable): The cache key of the value the endpoint would return.
+
+    Returns:
+        Response: A 304 Not Modified response, or None if the full response is needed.
+    """
+    info = cache.peek_info(key)
+    matched_etag = _matching_validator(info) if info is not None else None
+    if matched_etag is None:
+        return None
+    response = with_cache_headers(current_app.response_class(status=304), cache, key, info)
+    response.set_etag(matched_etag)
+    return response
+
+
+def with_cache_headers(response, cache: VersionedCache, key: Hashable, info: Optional[CacheInfo] = None):
+    """
+    Adds ETag and Cache-Control headers for a cached value to a response.
+
+    The headers are only added if the value is currently cached, since otherwise there
+    is no fingerprint to validate against.
+
+    Args:
+        response (Response): The response to decorate.
+        cache (VersionedCache): The cache holding the value.
+        key (Hashable): The cache key of the value in the response body.
+        info (CacheInfo, optional): The entry's info, if already looked up.
+
+    Returns:
+        Response: The same response.
+    """
+    info = info or cache.peek_info(key)
+    if info is not None:
+        response.set_etag(info.etag)
+        response.headers["Cache-Control"] = _cache_control(current_app.config["CATALOG_HTTP_MAX_AGE"])
+    return response
@@ -0,0 +1,105 @@
+import hashlib
+import io
+import os
+import tempfile
+from typing import BinaryIO, Dict, Iterable
+
+from PIL import Image, ImageOps
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds its size cap."""
+
+
+class InvalidImage(ValueError):
+    """Raised when an upload cannot be decoded as a supported image."""
+
+
+def stream_to_file(stream: BinaryIO, path: str, max_bytes: int) -> str:
+    """
+    Copies an upload stream to a file in fixed-size chunks, hashing it on the way.
+
+    The upload is never held in memory as a whole. If it turns out to be larger than
+    max_bytes, the partial file is removed and UploadTooLarge is raised.
+
+    Args:
+        stream (BinaryIO): The upload stream.
+        path (str): Destination file path.
+        max_bytes (int): Maximum number of bytes to accept.
+
+    Returns:
+        str: The SHA-256 hex digest of the uploaded bytes.
+    """
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(path, "wb") as output:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                output.write(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return digest.hexdigest()
+
+
+def render_square_variants(source_path: str, sizes: Iterable[int], image_format: str = "WEBP",
+                           quality: int = 80, max_pixels: int = 16_777_216) -> Dict[int, bytes]:
+    """
+    Decodes an image and re-encodes it as square, center-cropped variants.
+
+    EXIF orientation is applied and all metadata is dropped. Images with more than
+    max_pixels pixels are rejected before they are decoded, so a small compressed
+    file cannot expand into a huge bitmap.
+
+    Args:
+        source_path (str): Path of the uploaded image.
+        sizes (Iterable[int]): Edge lengths of the variants, in pixels.
+        image_format (str): Pillow format name of the variants.
+        quality (int): Encoder quality of the variants.
+        max_pixels (int): Largest accepted source image, in pixels.
+
+    Returns:
+        Dict[int, bytes]: The encoded variant for each size.
+    """
+    try:
+        with Image.open(source_path) as image:
+            if image.width * image.height > max_pixels:
+                raise InvalidImage("Image dimensions are too large")
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+            variants = {}
+            for size in sorted(set(sizes), reverse=True):
+                variant = ImageOps.fit(image, (size, size), method=Image.Resampling.LANCZOS)
+                buffer = io.BytesIO()
+                variant.save(buffer, format=image_format, quality=quality, method=6)
+                variants[size] = buffer.getvalue()
+            return variants
+    except (OSError, Image.DecompressionBombError, SyntaxError) as e:
+        raise InvalidImage("File is not a valid image") from e
+
+
+def write_atomic(path: str, data: bytes):
+    """
+    Writes a file by renaming a temporary file into place, so readers never see a
+    partially written file.
+    """
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as output:
+            output.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,44 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that serializes with orjson when it is installed.
+
+    Setting it as `app.json` makes every `jsonify` call in every blueprint use it.
+    Output matches the default provider: keys are sorted if `sort_keys` is set, and
+    dates, decimals and other non-native types still go through Flask's `default`
+    hook. Anything orjson cannot handle (e.g. integer keys larger than 64 bits, or
+    custom dumps() arguments) falls back to the stdlib encoder.
+    """
+
+    def _orjson_options(self) -> int:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def _dumps_bytes(self, obj) -> bytes:
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options())
+            except TypeError:
+                pass
+        return super().dumps(obj).encode()
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(obj)
+        body = self._dumps_bytes(obj) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
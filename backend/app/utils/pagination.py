@@ -0,0 +1,80 @@
+import base64
+import json
+from typing import Any, Dict, Tuple, Type, Union
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """
+    Encodes a keyset position into an opaque, URL-safe cursor string.
+
+    Args:
+        payload (Dict[str, Any]): JSON-serializable position, e.g. the sort value and ID
+            of the last row on the page.
+
+    Returns:
+        str: The encoded cursor.
+    """
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decodes a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): The cursor string from the client.
+
+    Returns:
+        Dict[str, Any]: The decoded keyset position.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid cursor")
+    return payload
+
+
+def cursor_field(position: Dict[str, Any], name: str, types: Union[Type, Tuple[Type, ...]]) -> Any:
+    """
+    Returns a field of a decoded cursor after checking its type.
+
+    Cursors come from the client, so their fields are checked before they are bound
+    into a query. bool is rejected even though it is a subclass of int, and so are
+    integers that do not fit a 64-bit database integer.
+
+    Args:
+        position (Dict[str, Any]): The decoded cursor.
+        name (str): The field to read.
+        types (type or tuple of types): The accepted types.
+
+    Returns:
+        Any: The field's value.
+
+    Raises:
+        ValueError: If the field is missing or of another type.
+    """
+    value = position.get(name)
+    if isinstance(value, bool) or not isinstance(value, types):
+        raise ValueError("Invalid cursor")
+    if isinstance(value, int) and not -2 ** 63 <= value < 2 ** 63:
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def parse_limit(value, default: int, maximum: int) -> int:
+    """
+    Parses a page size from a query parameter, clamping it to [1, maximum].
+
+    Raises:
+        ValueError: If the value is not an integer.
+    """
+    if value is None:
+        return default
+    return max(1, min(int(value), maximum))
@@ -0,0 +1,169 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordPoolSaturated(Exception):
+    """Raised when the hashing pool cannot take another job right now."""
+
+
+class PasswordPoolTimeout(Exception):
+    """Raised when a hashing job did not finish within PASSWORD_POOL_TIMEOUT."""
+
+
+def _hash_password(password: str, method: str) -> str:
+    return generate_password_hash(password, method=method)
+
+
+def _check_password(pwhash: str, password: str) -> bool:
+    return check_password_hash(pwhash, password)
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification in a bounded process pool.
+
+    Key-derivation functions like scrypt burn tens of milliseconds of CPU per call.
+    Running them in worker processes keeps request threads (and the GIL) free for
+    other endpoints. At most PASSWORD_POOL_SIZE jobs run and PASSWORD_POOL_MAX_QUEUE
+    more may wait; beyond that, calls fail fast with PasswordPoolSaturated instead of
+    piling up. A pool size of 0 hashes inline in the calling thread.
+
+    A call that waits longer than PASSWORD_POOL_TIMEOUT fails with PasswordPoolTimeout.
+    A job that is already running cannot be cancelled, so its slot stays taken until
+    it finishes. If a worker process dies, the broken pool is replaced and the job is
+    submitted once more.
+
+    The pool is created lazily in each process, so it is safe to use from forked
+    gunicorn workers. Its workers are started with PASSWORD_POOL_START_METHOD;
+    "forkserver" (the default) and "spawn" do not copy the request threads, locks and
+    database connections of the process that creates them, which "fork" would.
+    """
+
+    def __init__(self):
+        self.method = "scrypt:32768:8:1"
+        self.pool_size = 0
+        self.max_queue = 0
+        self.timeout = None
+        self.start_method = "forkserver"
+        self._executor = None
+        self._pid = None
+        self._slots = None
+        self._method_prefix = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Reads the hashing method and pool limits from the app config.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.configure(
+            method=app.config["PASSWORD_HASH_METHOD"],
+            pool_size=app.config["PASSWORD_POOL_SIZE"],
+            max_queue=app.config["PASSWORD_POOL_MAX_QUEUE"],
+            timeout=app.config["PASSWORD_POOL_TIMEOUT"],
+            start_method=app.config["PASSWORD_POOL_START_METHOD"],
+        )
+
+    def configure(self, method: str, pool_size: int, max_queue: int, timeout: float,
+                  start_method: str = "forkserver"):
+        """
+        Sets the hashing method and pool limits, shutting down any running pool.
+        """
+        self.shutdown()
+        self.method = method
+        self.pool_size = pool_size
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.start_method = start_method
+        self._method_prefix = None
+
+    def shutdown(self):
+        """
+        Stops the worker processes of this process's pool, if any.
+        """
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._pid = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.pool_size,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                )
+                self._slots = threading.BoundedSemaphore(self.pool_size + self.max_queue)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self._pid = None
+
+    def _submit(self, func, *args):
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise PasswordPoolSaturated("Password hashing pool is saturated")
+        try:
+            future = executor.submit(func, *args)
+        except BrokenProcessPool:
+            slots.release()
+            self._discard_executor(executor)
+            raise
+        except Exception:
+            slots.release()
+            raise
+        # Released when the job finishes, fails or is cancelled while still queued.
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Only a queued job can be cancelled; a running one keeps its slot until done.
+            future.cancel()
+            raise PasswordPoolTimeout("Timed out waiting for the password hashing pool")
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise
+
+    def _run(self, func, *args):
+        if self.pool_size <= 0:
+            return func(*args)
+        try:
+            return self._submit(func, *args)
+        except BrokenProcessPool:
+            return self._submit(func, *args)
+
+    def hash(self, password: str) -> str:
+        """
+        Hashes a password with the configured method.
+        """
+        return self._run(_hash_password, password, self.method)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """
+        Checks a password against a stored hash.
+        """
+        return self._run(_check_password, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """
+        Returns True if a stored hash was made with a method or cost other than the
+        configured one.
+        """
+        if self._method_prefix is None:
+            # Werkzeug expands short methods such as "scrypt" to their full parameters,
+            # so hash once to learn the canonical prefix for the configured method.
+            self._method_prefix = self.hash("").split("$", 1)[0]
+        return pwhash.split("$", 1)[0] != self._method_prefix
@@ -0,0 +1,158 @@
+import contextvars
+import functools
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flask import current_app, g, has_app_context, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+
+from .db_pool import engine_options
+
+_replica_scope = contextvars.ContextVar("replica_scope", default=False)
+_replica_used = contextvars.ContextVar("replica_used", default=False)
+
+
+def replica_read(func):
+    """
+    Marks a read-only service function whose SELECTs may be served by a read replica.
+
+    Only plain SELECTs issued while the function runs are routed; writes, flushes and
+    Core statements on `db.session.connection()` always use the primary. Reads still go
+    to the primary while the caller is pinned after a write (see ReplicaRouter).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        scope_token = _replica_scope.set(True)
+        used_token = _replica_used.set(False)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            used = _replica_used.get()
+            _replica_scope.reset(scope_token)
+            _replica_used.reset(used_token)
+            if used:
+                _replica_used.set(True)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Sends the SELECTs of `replica_read` functions to one of the configured replicas.
+
+    Replicas lag behind the primary, so reads are pinned to the primary for
+    REPLICA_STICKY_SECONDS after a write:
+
+    - in the request that wrote, from the write onwards;
+    - in later requests authenticated as the same user, whatever the client sends
+      besides its token.
+
+    Like the caches, the per-user pins live in the memory of a single worker process.
+
+    Other users keep reading from the replicas. So that they do not put the
+    replica's older state back into a cache that a write has just invalidated,
+    `may_store` refuses values read from a replica within the sticky window after
+    the cache's last invalidation.
+
+    Without replicas configured the router is inactive and everything uses the primary.
+    """
+
+    def __init__(self):
+        self.engines: List = []
+        self.sticky_seconds = 0.0
+        self._pinned_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Creates an engine per replica URI.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.engines = [create_engine(uri, **engine_options(uri, app.config))
+                        for uri in app.config["SQLALCHEMY_REPLICA_URIS"]]
+        self.sticky_seconds = app.config["REPLICA_STICKY_SECONDS"]
+        app.extensions["read_replicas"] = self
+        if self.engines:
+            app.logger.info("Routing read-only queries to %s replica(s).", len(self.engines))
+
+    @staticmethod
+    def _identity() -> Optional[str]:
+        if not has_request_context():
+            return None
+        try:
+            identity = get_jwt_identity()
+        except RuntimeError:
+            # The request is not behind jwt_required.
+            return None
+        return None if identity is None else str(identity)
+
+    def record_write(self):
+        """
+        Pins the current request and, if it is authenticated, its user to the primary.
+        """
+        if not has_app_context():
+            return
+        g._wrote_primary = True
+        identity = self._identity()
+        if identity is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            # Drop expired pins so the map only holds users who wrote recently.
+            self._pinned_until = {user: until for user, until in self._pinned_until.items() if until > now}
+            self._pinned_until[identity] = now + self.sticky_seconds
+
+    def is_pinned(self) -> bool:
+        """
+        Returns whether this request's reads must use the primary because it, or an
+        earlier request of the same user, wrote recently.
+        """
+        if not has_request_context():
+            return False
+        if g.get("_wrote_primary"):
+            return True
+        identity = self._identity()
+        return identity is not None and self._pinned_until.get(identity, 0) > time.monotonic()
+
+    def choose(self):
+        _replica_used.set(True)
+        return random.choice(self.engines)
+
+    def may_store(self, cache) -> bool:
+        """
+        Returns whether the value being built in this context may be stored in a cache.
+
+        Used as the cache's store_guard. A value read from a replica less than
+        REPLICA_STICKY_SECONDS after the cache was last invalidated may predate the
+        write that invalidated it, so it is returned but not stored.
+
+        Args:
+            cache (VersionedCache): The cache about to store the value.
+        """
+        if not _replica_used.get():
+            return True
+        return time.monotonic() - cache.invalidated_at >= self.sticky_seconds
+
+
+class RoutingSession(Session):
+    """
+    Flask-SQLAlchemy session that sends replica-eligible SELECTs to a read replica.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None or not has_app_context():
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        router = current_app.extensions.get("read_replicas")
+        if router is None or not router.engines:
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+        if self._flushing or getattr(clause, "is_dml", False):
+            router.record_write()
+        elif _replica_scope.get() and getattr(clause, "is_select", False) and not router.is_pinned():
+            return router.choose()
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
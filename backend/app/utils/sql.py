@@ -0,0 +1,25 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def upsert_insert(table, dialect_name: str):
+    """
+    Returns an INSERT construct that supports ON CONFLICT clauses for the given dialect.
+
+    Both Postgres and SQLite implement `INSERT ... ON CONFLICT`, but SQLAlchemy exposes
+    it through dialect-specific insert() constructs.
+
+    Args:
+        table: The model class or Table to insert into.
+        dialect_name (str): The database dialect, e.g. `db.engine.dialect.name`.
+
+    Returns:
+        Insert: An insert with on_conflict_do_nothing() and on_conflict_do_update().
+
+    Raises:
+        ValueError: If the dialect does not support ON CONFLICT.
+    """
+    if dialect_name == "postgresql":
+        return postgresql.insert(table)
+    if dialect_name == "sqlite":
+        return sqlite.insert(table)
+    raise ValueError(f"Upserts are not supported on {dialect_name}")
@@ -0,0 +1,186 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from flask import request
+from werkzeug.wsgi import wrap_file
+
+from ..middleware.compression import COMPRESSIBLE_MIMETYPES, brotli
+
+# Build tools put a content hash into the names of generated assets, e.g.
+# 'static/js/main.3f2a9c1e.js' or 'static/js/787.a1b2c3d4.chunk.js'.
+FINGERPRINTED = re.compile(r"\.[0-9a-f]{8,}\.")
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+@dataclass
+class StaticVariant:
+    path: str
+    size: int
+    data: Optional[bytes] = None
+
+
+@dataclass
+class StaticEntry:
+    mimetype: str
+    etag: str
+    mtime: float
+    fingerprinted: bool
+    variants: Dict[Optional[str], StaticVariant] = field(default_factory=dict)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+def precompress_file(path: str, gzip_level: int = 9, brotli_quality: int = 11) -> list:
+    """
+    Writes .gz and, if brotli is installed, .br siblings next to a file.
+
+    Returns:
+        list: The paths of the written files.
+    """
+    with open(path, "rb") as source:
+        data = source.read()
+    written = [path + ".gz"]
+    with open(path + ".gz", "wb") as output:
+        output.write(gzip.compress(data, compresslevel=gzip_level, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as output:
+            output.write(brotli.compress(data, quality=brotli_quality))
+        written.append(path + ".br")
+    return written
+
+
+class StaticManifest:
+    """
+    In-memory index of the frontend build, created once at startup.
+
+    Every file of the build is hashed and recorded with its size, type and any
+    precompressed .br/.gz siblings, so requests are answered without touching the
+    filesystem metadata. Files up to STATIC_MEMORY_MAX_BYTES (and index.html, always)
+    are kept in memory together with their compressed variants; larger files are
+    streamed from disk. Assets with a content hash in their name are served with an
+    immutable Cache-Control; everything else must be revalidated with its ETag.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.entries: Dict[str, StaticEntry] = {}
+        self.max_age = 0
+        self.memory_max_bytes = 0
+
+    def init_app(self, app, root: str):
+        """
+        Builds the manifest of a build directory.
+
+        Args:
+            app (Flask): The Flask application.
+            root (str): The build directory, e.g. frontend/build.
+        """
+        self.max_age = app.config["STATIC_IMMUTABLE_MAX_AGE"]
+        self.memory_max_bytes = app.config["STATIC_MEMORY_MAX_BYTES"]
+        self.build(root)
+        app.logger.info("Static manifest built with %s files from %s.", len(self.entries), root)
+
+    def build(self, root: str):
+        self.root = os.path.abspath(root)
+        entries = {}
+        for directory, _, filenames in os.walk(self.root):
+            names = set(filenames)
+            for name in filenames:
+                if any(name.endswith(suffix) for suffix in PRECOMPRESSED_SUFFIXES.values()) \
+                        and os.path.splitext(name)[0] in names:
+                    continue
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, self.root).replace(os.sep, "/")
+                entries[relative] = self._build_entry(path, relative, names)
+        self.entries = entries
+
+    def _build_entry(self, path: str, relative: str, siblings: set) -> StaticEntry:
+        stat = os.stat(path)
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        in_memory = relative == "index.html" or stat.st_size <= self.memory_max_bytes
+        entry = StaticEntry(
+            mimetype=mimetype,
+            etag=_hash_file(path),
+            mtime=stat.st_mtime,
+            fingerprinted=bool(FINGERPRINTED.search(os.path.basename(path))),
+        )
+        entry.variants[None] = self._build_variant(path, in_memory)
+
+        if mimetype in COMPRESSIBLE_MIMETYPES:
+            for coding, suffix in PRECOMPRESSED_SUFFIXES.items():
+                if os.path.basename(path) + suffix in siblings:
+                    entry.variants[coding] = self._build_variant(path + suffix, in_memory)
+            if relative == "index.html":
+                # index.html is tiny and requested on every page load, so compress it
+                # here if the build did not ship precompressed copies.
+                data = entry.variants[None].data
+                if "gzip" not in entry.variants:
+                    compressed = gzip.compress(data, mtime=0)
+                    entry.variants["gzip"] = StaticVariant(path, len(compressed), compressed)
+                if "br" not in entry.variants and brotli is not None:
+                    compressed = brotli.compress(data)
+                    entry.variants["br"] = StaticVariant(path, len(compressed), compressed)
+        return entry
+
+    @staticmethod
+    def _build_variant(path: str, in_memory: bool) -> StaticVariant:
+        if in_memory:
+            with open(path, "rb") as source:
+                data = source.read()
+            return StaticVariant(path, len(data), data)
+        return StaticVariant(path, os.path.getsize(path))
+
+    def get(self, path: str) -> Optional[StaticEntry]:
+        return self.entries.get(path)
+
+    def _choose_encoding(self, entry: StaticEntry) -> Optional[str]:
+        for coding in PRECOMPRESSED_SUFFIXES:
+            if coding in entry.variants and request.accept_encodings[coding]:
+                return coding
+        return None
+
+    def serve(self, path: str, response_class):
+        """
+        Builds the response for a file of the build.
+
+        Args:
+            path (str): The file's path relative to the build root; must be in the manifest.
+            response_class (type): The app's response class.
+
+        Returns:
+            Response: The file, a 304, or a 206/416 for range requests.
+        """
+        entry = self.entries[path]
+        coding = self._choose_encoding(entry)
+        variant = entry.variants[coding]
+        if variant.data is not None:
+            response = response_class(variant.data, mimetype=entry.mimetype)
+        else:
+            response = response_class(wrap_file(request.environ, open(variant.path, "rb")),
+                                      mimetype=entry.mimetype, direct_passthrough=True)
+            response.content_length = variant.size
+
+        if len(entry.variants) > 1:
+            response.vary.add("Accept-Encoding")
+        if coding is not None:
+            response.headers["Content-Encoding"] = coding
+        response.set_etag(f"{entry.etag}-{coding}" if coding else entry.etag)
+        response.last_modified = entry.mtime
+        if entry.fingerprinted:
+            response.cache_control.public = True
+            response.cache_control.max_age = self.max_age
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response.make_conditional(request, accept_ranges=coding is None, complete_length=variant.size)
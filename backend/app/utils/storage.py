@@ -0,0 +1,243 @@
+import abc
+import mimetypes
+import os
+
+from flask import redirect, send_from_directory
+from werkzeug.exceptions import NotFound
+
+from .cache import VersionedCache
+from .images import write_atomic
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # pragma: no cover - boto3 is only needed for the s3 backend
+    boto3 = None
+
+
+def _content_type(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def _cache_control(max_age: int, immutable: bool) -> str:
+    if immutable:
+        return f"public, max-age={max_age}, immutable"
+    return "no-cache"
+
+
+class StorageBackend(abc.ABC):
+    """
+    Interface of a flat object store for user-uploaded files.
+    """
+
+    @abc.abstractmethod
+    def exists(self, name: str) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save(self, name: str, data: bytes, immutable: bool = False):
+        """
+        Stores an object, replacing any existing object with the same name.
+
+        Args:
+            name (str): The object name.
+            data (bytes): The object content.
+            immutable (bool): Whether the content under this name never changes, so
+                clients may cache it indefinitely.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, name: str):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list(self) -> list:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def serve(self, name: str, fallback: str = None, immutable: bool = False):
+        """
+        Builds the response that delivers an object to a client.
+
+        Args:
+            name (str): The object name.
+            fallback (str, optional): Object to deliver instead if the requested one
+                is missing.
+            immutable (bool): Whether the response may be cached indefinitely.
+
+        Returns:
+            Response: The object itself, or a redirect to where it can be downloaded.
+        """
+        raise NotImplementedError
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Stores objects as files in a local directory and serves them from the worker.
+    """
+
+    def __init__(self, folder: str, max_age: int):
+        self.folder = folder
+        self.max_age = max_age
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.folder, name)
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self._path(name))
+
+    def save(self, name: str, data: bytes, immutable: bool = False):
+        os.makedirs(self.folder, exist_ok=True)
+        write_atomic(self._path(name), data)
+
+    def delete(self, name: str):
+        if self.exists(name):
+            os.remove(self._path(name))
+
+    def list(self) -> list:
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(name for name in os.listdir(self.folder)
+                      if not name.startswith(".") and os.path.isfile(self._path(name)))
+
+    def serve(self, name: str, fallback: str = None, immutable: bool = False):
+        try:
+            response = send_from_directory(self.folder, name, max_age=self.max_age if immutable else None)
+        except NotFound:
+            if fallback is None:
+                raise
+            return send_from_directory(self.folder, fallback)
+        if immutable:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        return response
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Stores objects in an S3-compatible bucket and sends clients there directly.
+
+    Downloads are redirects to presigned GET URLs, so workers never stream object
+    bytes. Presigned URLs are cached for half their lifetime and the redirect itself
+    is cacheable for that long, which keeps the final URL stable enough for browsers
+    to reuse their cached copy of the object. Only a URL cache miss checks that the
+    object exists, so that a missing one is redirected to the fallback.
+
+    Any S3-compatible endpoint works, including local stand-ins such as MinIO or
+    moto's server mode, by setting an endpoint URL.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = None, region: str = None,
+                 presign_expires: int = 3600, max_age: int = 0, client=None):
+        if client is None and boto3 is None:
+            raise RuntimeError("boto3 is required for the s3 storage backend")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.presign_expires = presign_expires
+        self.max_age = max_age
+        self.client = client or boto3.client(
+            "s3", endpoint_url=endpoint_url, region_name=region,
+            config=BotoConfig(signature_version="s3v4"),
+        )
+        self._presigned_urls = VersionedCache(max_entries=4096, ttl=presign_expires / 2)
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    def exists(self, name: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def save(self, name: str, data: bytes, immutable: bool = False):
+        self.client.put_object(
+            Bucket=self.bucket, Key=self._key(name), Body=data,
+            ContentType=_content_type(name), CacheControl=_cache_control(self.max_age, immutable),
+        )
+        self._presigned_urls.delete(name)
+
+    def delete(self, name: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+        self._presigned_urls.delete(name)
+
+    def list(self) -> list:
+        names = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            names.extend(item["Key"][len(self.prefix):] for item in page.get("Contents", []))
+        return sorted(names)
+
+    def presigned_url(self, name: str) -> str:
+        return self._presigned_urls.get_or_set(name, lambda: self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self._key(name)}, ExpiresIn=self.presign_expires,
+        ))
+
+    def serve(self, name: str, fallback: str = None, immutable: bool = False):
+        url = self._presigned_urls.get(name)
+        if url is None:
+            # Missing objects are not cached, so one uploaded later is found on its
+            # next request.
+            if fallback is not None and not self.exists(name):
+                name = fallback
+            url = self.presigned_url(name)
+        response = redirect(url, code=302)
+        response.cache_control.private = True
+        response.cache_control.max_age = int(self.presign_expires / 2)
+        return response
+
+
+class AvatarStorage:
+    """
+    Storage for avatar images, backed by the backend named in AVATAR_STORAGE.
+
+    'local' keeps files in AVATAR_LOCAL_FOLDER on this machine. 's3' keeps them in
+    AVATAR_S3_BUCKET, so any number of backend nodes can share avatars without a
+    shared disk.
+    """
+
+    def __init__(self):
+        self.backend = None
+
+    def init_app(self, app):
+        """
+        Creates the configured storage backend.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        config = app.config
+        kind = config["AVATAR_STORAGE"]
+        if kind == "local":
+            self.backend = LocalStorageBackend(config["AVATAR_LOCAL_FOLDER"], config["AVATAR_CACHE_MAX_AGE"])
+        elif kind == "s3":
+            self.backend = S3StorageBackend(
+                bucket=config["AVATAR_S3_BUCKET"],
+                prefix=config["AVATAR_S3_PREFIX"],
+                endpoint_url=config["AVATAR_S3_ENDPOINT_URL"],
+                region=config["AVATAR_S3_REGION"],
+                presign_expires=config["AVATAR_S3_PRESIGN_EXPIRES"],
+                max_age=config["AVATAR_CACHE_MAX_AGE"],
+            )
+        else:
+            raise ValueError(f"Unknown AVATAR_STORAGE backend: {kind}")
+
+    def exists(self, name: str) -> bool:
+        return self.backend.exists(name)
+
+    def save(self, name: str, data: bytes, immutable: bool = False):
+        self.backend.save(name, data, immutable=immutable)
+
+    def delete(self, name: str):
+        self.backend.delete(name)
+
+    def list(self) -> list:
+        return self.backend.list()
+
+    def serve(self, name: str, fallback: str = None, immutable: bool = False):
+        return self.backend.serve(name, fallback=fallback, immutable=immutable)
@@ -0,0 +1,139 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict
+
+from flask import has_request_context, request
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is
+# written as an additional JSON field.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "http_method", "http_path"}
+
+
+# Pass as `extra=AUDIT` on records of state changes (purchases, reviews, basket and
+# favorites updates); SamplingFilter never drops them.
+AUDIT = {"audit": True}
+
+
+def parse_sampling_rates(value: str) -> Dict[str, float]:
+    """
+    Parses 'logger=rate,logger=rate' into a mapping of logger names to sample rates.
+    """
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "http_method", None):
+            entry["method"] = record.http_method
+            entry["path"] = record.http_path
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of the INFO and DEBUG records of selected loggers.
+
+    Rates apply to a logger and its children; the most specific configured name wins.
+    Warnings, errors and audit records (logged with `extra=AUDIT`) always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name: str) -> float:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates or getattr(record, "audit", False):
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks the logging thread.
+
+    Records are reduced to plain data on the calling thread (message interpolated,
+    traceback rendered, request method and path captured) and handed to a background
+    listener that formats and writes them. If the queue is full, the record is
+    dropped and counted instead of stalling the request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.listener = None
+        self._lock = threading.Lock()
+
+    def start_listener(self, *handlers: logging.Handler):
+        """
+        Starts the background thread that writes queued records to the given handlers.
+        """
+        self.listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop_listener)
+
+    def stop_listener(self):
+        """
+        Writes out the queued records and stops the background thread. Safe to call
+        more than once.
+        """
+        with self._lock:
+            listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+            atexit.unregister(self.stop_listener)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if has_request_context():
+            record.http_method = request.method
+            record.http_path = request.path
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
@@ -0,0 +1,37 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn is started from this directory.
+
+Each worker keeps its own Prometheus samples in PROMETHEUS_MULTIPROC_DIR so that
+metrics report totals across all workers. If METRICS_PORT is set, the master serves
+them on METRICS_ADDR:METRICS_PORT, a bind separate from the API's that the load
+balancer does not expose.
+"""
+import os
+import shutil
+
+# prometheus_client picks multiprocess mode when it is first imported, and workers
+# inherit the master's import, so the directory must be set before the import below.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+
+from prometheus_client import CollectorRegistry, multiprocess, start_http_server  # noqa: E402
+
+
+def on_starting(server):
+    # Samples from a previous run would otherwise be added to the new totals.
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def when_ready(server):
+    port = os.getenv("METRICS_PORT")
+    if port:
+        addr = os.getenv("METRICS_ADDR", "127.0.0.1")
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(int(port), addr=addr, registry=registry)
+        server.log.info("Serving metrics on %s:%s", addr, port)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,62 @@
+"""Favorites and purchases join tables, copied from the legacy ID lists
+
+Creates user_favorites and user_purchases and copies the comma-separated
+users.fav_products and users.purchased_products values into them. IDs of products
+that no longer exist are dropped. The legacy columns are left as they are, so the
+previous release keeps working; a later migration removes them.
+
+Revision ID: 1d9e6b3f5a27
+Revises: c57e0f4a2d18
+Create Date: 2026-10-18 09:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d9e6b3f5a27'
+down_revision = 'c57e0f4a2d18'
+branch_labels = None
+depends_on = None
+
+TABLES = [
+    ('user_favorites', 'fav_products', 'ix_user_favorites_product_id'),
+    ('user_purchases', 'purchased_products', 'ix_user_purchases_product_id'),
+]
+
+
+def _copy_legacy_list(table, column):
+    bind = op.get_bind()
+    users = sa.table('users', sa.column('id'), sa.column(column))
+    existing_products = set(bind.execute(sa.text('SELECT id FROM products')).scalars())
+    rows = [
+        {'user_id': user_id, 'product_id': int(product_id)}
+        for user_id, value in bind.execute(sa.select(users.c.id, users.c[column]).where(users.c[column] != ''))
+        for product_id in set(filter(None, (value or '').split(',')))
+        if int(product_id) in existing_products
+    ]
+    if rows:
+        op.bulk_insert(table, rows)
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    for name, column, index_name in TABLES:
+        if name in existing:
+            continue
+        table = op.create_table(
+            name,
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id', ondelete='CASCADE'),
+                      primary_key=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+        op.create_index(index_name, name, ['product_id'])
+        _copy_legacy_list(table, column)
+
+
+def downgrade():
+    for name, _, index_name in reversed(TABLES):
+        op.drop_index(index_name, table_name=name)
+        op.drop_table(name)
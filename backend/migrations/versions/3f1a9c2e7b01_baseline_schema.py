@@ -0,0 +1,70 @@
+"""Baseline schema: users, products, reviews and basket_items
+
+The tables as created by sqlite_dump_clean.sql. Databases loaded from that dump
+already have them, so each table is only created when it is missing.
+
+Revision ID: 3f1a9c2e7b01
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2e7b01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in existing:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('username', sa.String(length=50), nullable=False),
+            sa.Column('email', sa.String(length=100), nullable=False, unique=True),
+            sa.Column('password', sa.String(length=255), nullable=False),
+            sa.Column('fav_products', sa.String(), nullable=True),
+            sa.Column('purchased_products', sa.String(), nullable=True),
+            sa.Column('avatar', sa.String(length=255), nullable=True),
+        )
+    if 'products' not in existing:
+        op.create_table(
+            'products',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('description', sa.String(length=500), nullable=True),
+            sa.Column('price', sa.Float(), nullable=False),
+            sa.Column('category', sa.String(length=50), nullable=True),
+            sa.Column('image_url', sa.String(length=255), nullable=True),
+            sa.Column('is_alcohol', sa.Boolean(), nullable=True),
+        )
+    if 'reviews' not in existing:
+        op.create_table(
+            'reviews',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), nullable=False),
+            sa.Column('author', sa.String(length=100), nullable=False),
+            sa.Column('rating', sa.Float(), nullable=False),
+            sa.Column('comment', sa.String(length=500), nullable=True),
+        )
+    if 'basket_items' not in existing:
+        op.create_table(
+            'basket_items',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table('basket_items')
+    op.drop_table('reviews')
+    op.drop_table('products')
+    op.drop_table('users')
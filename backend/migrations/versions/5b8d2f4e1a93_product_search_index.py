@@ -0,0 +1,76 @@
+"""Full-text search index over products
+
+On SQLite, an external-content FTS5 table over product names, descriptions and
+categories, the triggers that keep it in sync with products, and a first fill from
+the existing rows. On Postgres, a GIN index over a weighted tsvector expression,
+built CONCURRENTLY so that products stays writable while it builds.
+
+The Postgres expression must stay identical to PG_SEARCH_DOCUMENT in
+app/services/search_service.py, or the planner will not use the index. If the
+concurrent build is interrupted, `flask rebuild-search-index` repairs the index.
+
+Revision ID: 5b8d2f4e1a93
+Revises: e48a1c7d3b52
+Create Date: 2026-10-18 09:35:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8d2f4e1a93'
+down_revision = 'e48a1c7d3b52'
+branch_labels = None
+depends_on = None
+
+PG_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts(rowid, name, description, category) "
+    "VALUES (new.id, new.name, new.description, new.category); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name, description, category) "
+    "VALUES ('delete', old.id, old.name, old.description, old.category); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name, description, category) "
+    "VALUES ('delete', old.id, old.name, old.description, old.category); "
+    "INSERT INTO products_fts(rowid, name, description, category) "
+    "VALUES (new.id, new.name, new.description, new.category); END",
+]
+
+
+def _upgrade_sqlite():
+    if 'products_fts' not in sa.inspect(op.get_bind()).get_table_names():
+        op.execute(
+            "CREATE VIRTUAL TABLE products_fts USING fts5("
+            "name, description, category, content='products', content_rowid='id', tokenize='porter unicode61')"
+        )
+        op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+    for statement in SQLITE_TRIGGERS:
+        op.execute(statement)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        _upgrade_sqlite()
+        return
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_search "
+                   f"ON products USING GIN (({PG_SEARCH_DOCUMENT}))")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('products_fts_au', 'products_fts_ad', 'products_fts_ai'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS products_fts")
+        return
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_products_search")
@@ -0,0 +1,61 @@
+"""One basket row per user and product
+
+Merges duplicate (user_id, product_id) basket rows into the oldest one, summing
+their quantities, then adds uq_basket_items_user_product so basket upserts can
+rely on it.
+
+Revision ID: 6a0c8e2b4f39
+Revises: 1d9e6b3f5a27
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a0c8e2b4f39'
+down_revision = '1d9e6b3f5a27'
+branch_labels = None
+depends_on = None
+
+NAME = 'uq_basket_items_user_product'
+
+
+def _merge_duplicates():
+    op.execute(sa.text(
+        "UPDATE basket_items SET quantity = ("
+        " SELECT SUM(duplicate.quantity) FROM basket_items AS duplicate"
+        " WHERE duplicate.user_id = basket_items.user_id AND duplicate.product_id = basket_items.product_id"
+        ") WHERE id IN ("
+        " SELECT MIN(id) FROM basket_items GROUP BY user_id, product_id HAVING COUNT(*) > 1"
+        ")"
+    ))
+    op.execute(sa.text(
+        "DELETE FROM basket_items WHERE id NOT IN ("
+        " SELECT MIN(id) FROM basket_items GROUP BY user_id, product_id"
+        ")"
+    ))
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    names = {constraint['name'] for constraint in inspector.get_unique_constraints('basket_items')}
+    names |= {index['name'] for index in inspector.get_indexes('basket_items')}
+    if NAME in names:
+        return
+
+    _merge_duplicates()
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot add a constraint to an existing table; a unique index enforces
+        # the same rule and serves ON CONFLICT (user_id, product_id).
+        op.create_index(NAME, 'basket_items', ['user_id', 'product_id'], unique=True)
+    else:
+        op.create_unique_constraint(NAME, 'basket_items', ['user_id', 'product_id'])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.drop_index(NAME, table_name='basket_items')
+    else:
+        op.drop_constraint(NAME, 'basket_items', type_='unique')
@@ -0,0 +1,36 @@
+"""Catalog indexes: reviews by product, products by sort key
+
+Revision ID: 8b42d6e0c913
+Revises: 3f1a9c2e7b01
+Create Date: 2026-10-18 09:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b42d6e0c913'
+down_revision = '3f1a9c2e7b01'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_reviews_product_id', 'reviews', ['product_id']),
+    ('ix_products_price_id', 'products', ['price', 'id']),
+    ('ix_products_name_id', 'products', ['name', 'id']),
+    ('ix_products_category_price_id', 'products', ['category', 'price', 'id']),
+    ('ix_products_category_name_id', 'products', ['category', 'name', 'id']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
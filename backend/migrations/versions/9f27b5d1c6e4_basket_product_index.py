@@ -0,0 +1,29 @@
+"""Index basket_items.product_id
+
+The foreign key to products already exists in the dump's schema; the index backs
+the basket's join to products and the foreign key check on product deletes.
+
+Revision ID: 9f27b5d1c6e4
+Revises: 6a0c8e2b4f39
+Create Date: 2026-10-18 09:25:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f27b5d1c6e4'
+down_revision = '6a0c8e2b4f39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('basket_items')}
+    if 'ix_basket_items_product_id' not in indexes:
+        op.create_index('ix_basket_items_product_id', 'basket_items', ['product_id'])
+
+
+def downgrade():
+    op.drop_index('ix_basket_items_product_id', table_name='basket_items')
@@ -0,0 +1,76 @@
+"""Review aggregates on products, backfilled from reviews
+
+Adds the stored review count, rating sum, average and 1-5 star histogram, fills
+them from the existing reviews with one set-based UPDATE, and indexes the average
+for the rating sort.
+
+Revision ID: c57e0f4a2d18
+Revises: 8b42d6e0c913
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c57e0f4a2d18'
+down_revision = '8b42d6e0c913'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ('review_count', sa.Integer()),
+    ('rating_sum', sa.Float()),
+    ('average_rating', sa.Float()),
+    ('rating_1_count', sa.Integer()),
+    ('rating_2_count', sa.Integer()),
+    ('rating_3_count', sa.Integer()),
+    ('rating_4_count', sa.Integer()),
+    ('rating_5_count', sa.Integer()),
+]
+
+# Same buckets as product_model.rating_bucket: the rating rounded half up, clamped to 1-5.
+BUCKETS = {1: (None, 1.5), 2: (1.5, 2.5), 3: (2.5, 3.5), 4: (3.5, 4.5), 5: (4.5, None)}
+
+
+def _backfill():
+    products = sa.table('products', sa.column('id'), *(sa.column(name) for name, _ in COLUMNS))
+    reviews = sa.table('reviews', sa.column('id'), sa.column('product_id'), sa.column('rating'))
+
+    def aggregate(expression, *criteria):
+        return sa.select(expression).where(reviews.c.product_id == products.c.id, *criteria).scalar_subquery()
+
+    values = {
+        'review_count': aggregate(sa.func.count(reviews.c.id)),
+        'rating_sum': aggregate(sa.func.coalesce(sa.func.sum(reviews.c.rating), 0)),
+        'average_rating': aggregate(sa.func.coalesce(sa.func.avg(reviews.c.rating), 0)),
+    }
+    for stars, (low, high) in BUCKETS.items():
+        criteria = []
+        if low is not None:
+            criteria.append(reviews.c.rating >= low)
+        if high is not None:
+            criteria.append(reviews.c.rating < high)
+        values[f'rating_{stars}_count'] = aggregate(sa.func.count(reviews.c.id), *criteria)
+    op.execute(products.update().values(**values))
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('products')}
+    missing = [(name, type_) for name, type_ in COLUMNS if name not in existing]
+    for name, type_ in missing:
+        op.add_column('products', sa.Column(name, type_, nullable=False, server_default='0'))
+    if missing:
+        _backfill()
+
+    if 'ix_products_average_rating_id' not in {index['name'] for index in inspector.get_indexes('products')}:
+        op.create_index('ix_products_average_rating_id', 'products', ['average_rating', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_products_average_rating_id', table_name='products')
+    with op.batch_alter_table('products') as batch_op:
+        for name, _ in reversed(COLUMNS):
+            batch_op.drop_column(name)
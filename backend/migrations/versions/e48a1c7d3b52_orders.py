@@ -0,0 +1,51 @@
+"""Orders and order items
+
+Revision ID: e48a1c7d3b52
+Revises: 9f27b5d1c6e4
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e48a1c7d3b52'
+down_revision = '9f27b5d1c6e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'orders' not in existing:
+        op.create_table(
+            'orders',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+            sa.Column('total', sa.Float(), nullable=False),
+        )
+        op.create_index('ix_orders_user_id_id', 'orders', ['user_id', 'id'])
+
+    if 'order_items' not in existing:
+        op.create_table(
+            'order_items',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), nullable=False),
+            sa.Column('product_name', sa.String(length=100), nullable=False),
+            sa.Column('unit_price', sa.Float(), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+        )
+        op.create_index('ix_order_items_order_id', 'order_items', ['order_id'])
+        op.create_index('ix_order_items_product_id', 'order_items', ['product_id'])
+
+
+def downgrade():
+    op.drop_index('ix_order_items_product_id', table_name='order_items')
+    op.drop_index('ix_order_items_order_id', table_name='order_items')
+    op.drop_table('order_items')
+    op.drop_index('ix_orders_user_id_id', table_name='orders')
+    op.drop_table('orders')
@@ -0,0 +1,32 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app import Config, create_app
+
+LOCAL_DB = Path(__file__).resolve().parent.parent / "app" / "local.db"
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """
+    The application backed by a temporary copy of the bundled local.db, so tests
+    that write do not touch the real file.
+    """
+    folder = tmp_path_factory.mktemp("db")
+    database = folder / "local.db"
+    shutil.copy(LOCAL_DB, database)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{database}")
+        monkeypatch.setattr(Config, "SQLALCHEMY_REPLICA_URIS", [])
+        monkeypatch.setattr(Config, "LOG_FILE", str(folder / "app.log"))
+        monkeypatch.setattr(Config, "LOG_CONSOLE", False)
+        monkeypatch.setattr(Config, "PASSWORD_POOL_SIZE", 0)
+        monkeypatch.setattr(Config, "JWT_SECRET_KEY", "test-secret-key-of-sufficient-length")
+        yield create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.cache import VersionedCache
+
+
+def _run_concurrently(target, count=10):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_get_or_set_builds_each_key_once():
+    cache = VersionedCache(ttl=60)
+    builds = []
+    results = []
+
+    def builder():
+        builds.append(1)
+        time.sleep(0.1)
+        return {"value": len(builds)}
+
+    _run_concurrently(lambda: results.append(cache.get_or_set("key", builder)))
+
+    assert len(builds) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_get_or_set_retries_after_a_failed_build():
+    cache = VersionedCache(ttl=60)
+    builds = []
+    results = []
+
+    def builder():
+        builds.append(1)
+        time.sleep(0.1)
+        if len(builds) == 1:
+            raise RuntimeError("build failed")
+        return "value"
+
+    def call():
+        try:
+            results.append(cache.get_or_set("key", builder))
+        except RuntimeError:
+            results.append("error")
+
+    _run_concurrently(call, count=5)
+
+    assert len(builds) == 2
+    assert sorted(results) == ["error"] + ["value"] * 4
+
+
+def test_get_or_set_does_not_store_a_build_that_raced_an_invalidation():
+    cache = VersionedCache(ttl=60)
+
+    def builder():
+        cache.invalidate()
+        return "stale"
+
+    assert cache.get_or_set("key", builder) == "stale"
+    assert cache.get("key") is None
+
+
+def test_get_or_set_propagates_builder_errors():
+    cache = VersionedCache(ttl=60)
+
+    def builder():
+        raise ValueError("build failed")
+
+    with pytest.raises(ValueError):
+        cache.get_or_set("key", builder)
+    assert cache.get("key") is None
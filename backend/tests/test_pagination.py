@@ -0,0 +1,65 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.utils.pagination import encode_cursor
+
+INVALID_PRODUCT_CURSORS = [
+    {"sort": "price", "desc": False, "id": {"a": 1}, "value": [1]},
+    {"sort": "price", "desc": False, "id": 1, "value": [1]},
+    {"sort": "price", "desc": False, "id": True, "value": 1.5},
+    {"sort": "price", "desc": False, "id": 2 ** 70, "value": 1.5},
+    {"sort": "price", "desc": False, "id": 1},
+    {"sort": "name", "desc": False, "id": 1, "value": 2},
+    {"sort": "id", "desc": False, "id": "1"},
+]
+
+
+@pytest.mark.parametrize("position", INVALID_PRODUCT_CURSORS)
+def test_products_page_rejects_malformed_cursor(client, position):
+    response = client.get(f"/api/products/all_products?limit=2&sort={position['sort']}"
+                          f"&cursor={encode_cursor(position)}")
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
+
+
+def test_products_page_follows_its_own_cursor(client):
+    first = client.get("/api/products/all_products?limit=2&sort=price").get_json()
+
+    response = client.get(f"/api/products/all_products?limit=2&sort=price&cursor={first['next_cursor']}")
+
+    assert response.status_code == 200
+    assert [item["id"] for item in response.get_json()["items"]] != [item["id"] for item in first["items"]]
+
+
+@pytest.mark.parametrize("position", [
+    {"search": ["milk"], "score": "x", "id": 1},
+    {"search": ["milk"], "score": -1.0, "id": [1]},
+    {"search": ["milk"], "score": None, "id": 1},
+    {"search": ["milk"], "score": -1.0},
+])
+def test_search_rejects_malformed_cursor(client, position):
+    response = client.get(f"/api/products/search?q=milk&limit=1&cursor={encode_cursor(position)}")
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
+
+
+def test_search_follows_its_own_cursor(client):
+    first = client.get("/api/products/search?q=milk&limit=1").get_json()
+
+    response = client.get(f"/api/products/search?q=milk&limit=1&cursor={first['next_cursor']}")
+
+    assert response.status_code == 200
+    assert response.get_json()["items"][0]["id"] != first["items"][0]["id"]
+
+
+@pytest.mark.parametrize("position", [{"id": "5"}, {"id": True}, {"id": {"a": 1}}, {"id": 2 ** 70}, {}])
+def test_orders_reject_malformed_cursor(app, client, position):
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity='3')}"}
+
+    response = client.get(f"/api/me/orders?cursor={encode_cursor(position)}", headers=headers)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
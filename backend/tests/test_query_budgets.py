@@ -0,0 +1,40 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import catalog_cache, search_cache, user_profile_cache
+from app.testing.query_budget import ENDPOINT_BUDGETS, assert_max_queries
+
+USER_ID = 3
+
+
+@pytest.fixture
+def auth_headers(app):
+    with app.app_context():
+        token = create_access_token(identity=str(USER_ID))
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.parametrize("budget", ENDPOINT_BUDGETS, ids=lambda budget: budget.name)
+def test_endpoint_query_budget(client, auth_headers, budget):
+    headers = dict(budget.headers)
+    if budget.authenticated:
+        headers.update(auth_headers)
+    # Cold caches: the budget is what a cache miss costs.
+    catalog_cache.clear()
+    search_cache.clear()
+    user_profile_cache.clear()
+
+    with assert_max_queries(budget.max_queries):
+        response = client.open(budget.path, method=budget.method, json=budget.json, headers=headers)
+
+    assert response.status_code < 400, response.get_data(as_text=True)
+
+
+def test_cached_catalog_costs_no_queries(client):
+    catalog_cache.clear()
+    client.get("/api/products/all_products")
+
+    with assert_max_queries(0):
+        response = client.get("/api/products/all_products")
+
+    assert response.status_code == 200
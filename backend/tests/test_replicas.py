@@ -0,0 +1,57 @@
+import shutil
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import create_engine, event
+
+from app import read_replicas
+
+WRITER_ID = 3
+OTHER_USER_ID = 4
+PRODUCT_ID = 318
+
+
+@pytest.fixture
+def replica_statements(app, tmp_path, monkeypatch):
+    """
+    Routes replica reads to a copy of the test database taken before the test wrote
+    anything, and collects the statements the copy executes.
+    """
+    replica = tmp_path / "replica.db"
+    shutil.copy(app.config["SQLALCHEMY_DATABASE_URI"].removeprefix("sqlite:///"), replica)
+    engine = create_engine(f"sqlite:///{replica}")
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    monkeypatch.setattr(read_replicas, "engines", [engine])
+    monkeypatch.setattr(read_replicas, "_pinned_until", {})
+    yield statements
+    engine.dispose()
+
+
+def _auth_headers(app, user_id):
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+
+def test_reads_after_a_write_use_the_primary_in_later_requests(app, client, replica_statements):
+    writer = _auth_headers(app, WRITER_ID)
+
+    response = client.post("/api/me/purchase", json={"purchased_products": [PRODUCT_ID]}, headers=writer)
+    assert response.status_code == 200
+
+    # A fresh client, since the browser app sends no cookies to the API.
+    response = app.test_client().get("/api/me/purchased-products", headers=writer)
+
+    assert response.status_code == 200
+    assert PRODUCT_ID in response.get_json()
+    assert replica_statements == []
+
+
+def test_other_users_keep_reading_from_the_replica(app, client, replica_statements):
+    client.post("/api/me/purchase", json={"purchased_products": [PRODUCT_ID]},
+                headers=_auth_headers(app, WRITER_ID))
+
+    response = client.get("/api/me/purchased-products", headers=_auth_headers(app, OTHER_USER_ID))
+
+    assert response.status_code == 200
+    assert replica_statements
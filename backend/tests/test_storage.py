@@ -0,0 +1,74 @@
+from unittest import mock
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.utils.storage import S3StorageBackend, StorageBackend
+
+BUCKET = "avatars"
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def backend(s3_client):
+    return S3StorageBackend(BUCKET, prefix="avatars/", presign_expires=600, max_age=3600, client=s3_client)
+
+
+def test_storage_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+
+def test_save_exists_list_delete(backend, s3_client):
+    backend.save("a.webp", b"image", immutable=True)
+
+    assert backend.exists("a.webp")
+    assert not backend.exists("b.webp")
+    assert backend.list() == ["a.webp"]
+    head = s3_client.head_object(Bucket=BUCKET, Key="avatars/a.webp")
+    assert head["ContentType"] == "image/webp"
+    assert head["CacheControl"] == "public, max-age=3600, immutable"
+
+    backend.delete("a.webp")
+    assert not backend.exists("a.webp")
+    assert backend.list() == []
+
+
+def test_serve_redirects_to_presigned_url(backend):
+    backend.save("a.png", b"image")
+
+    response = backend.serve("a.png", fallback="default.png")
+
+    assert response.status_code == 302
+    assert "/avatars/a.png?" in response.location
+    assert response.cache_control.private
+    assert response.cache_control.max_age == 300
+
+
+def test_serve_checks_existence_only_on_cache_miss(backend, s3_client):
+    backend.save("a.png", b"image")
+    with mock.patch.object(s3_client, "head_object", wraps=s3_client.head_object) as head_object:
+        first = backend.serve("a.png", fallback="default.png")
+        second = backend.serve("a.png", fallback="default.png")
+
+    assert head_object.call_count == 1
+    assert first.location == second.location
+
+
+def test_serve_missing_object_redirects_to_fallback(backend):
+    backend.save("default.png", b"default")
+
+    response = backend.serve("missing.png", fallback="default.png")
+    assert "/avatars/default.png?" in response.location
+
+    backend.save("missing.png", b"image")
+    response = backend.serve("missing.png", fallback="default.png")
+    assert "/avatars/missing.png?" in response.location
@@ -66,7 +66,7 @@ const useUserInfo = () => {
   const getAvatarUrl = (author) => {
     const user = users.find((user) => user.username === author);
     return user
-      ? `${process.env.REACT_APP_BACKEND_SERVER}/api/me/avatar/${user.avatar}`
+      ? `${process.env.REACT_APP_BACKEND_SERVER}/api/me/avatar/${user.avatar}?size=64`
       : `${process.env.REACT_APP_BACKEND_SERVER}/api/me/avatar/user_default.png`;
   };
 